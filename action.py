@@ -9,24 +9,44 @@ class ActionType(Enum):
 
 
 class Action:
-    """Data structure for describing an agent's action"""
+    """
+    Data structure for describing an agent's action: an (action_type, target) record.
+    The description is formatted from template and args only when it is printed.
+    """
+    __slots__ = ('agent', 'action_type', 'target', 'end_time', 'template', 'args')
+
     def __init__(self,
                  agent,
                  # optional arguments
                  action_type: ActionType=None,
-                 description='',
+                 target=None,
                  end_time=0,
-                 callback=None):
+                 template='',
+                 args=()):
+        """
+        :param target: the destination node of a GOTO action, or the edge of a BLOCK action
+        :param template: str.format template of the description, formatted with args
+        """
         self.agent = agent
         self.action_type = action_type
-        self.description = description
+        self.target = target
         self.end_time = end_time
-        self.callback = callback
+        self.template = template
+        self.args = args
+
+    @property
+    def description(self):
+        return self.template.format(*self.args)
 
-    def execute(self):
-        if self.callback is not None:
-            self.callback()
-            print('[DONE]' + self.description)
+    def execute(self, env):
+        """completes a registered action (see Agent.register_action)"""
+        if self.action_type == ActionType.GOTO:
+            self.agent.goto(env, self.target)
+        elif self.action_type == ActionType.BLOCK:
+            self.agent.block(env, self.target)
+        else:
+            return
+        print('[DONE]' + self.description)
 
     def describe(self):
         print(self.description)
@@ -1,8 +1,20 @@
 from environment import Environment, EvacuateNode
 from configurator import Configurator, debug
 from action import Action, ActionType
-from copy import copy as shallow_copy
-from typing import List
+from typing import List, NamedTuple
+
+
+class AgentSnapshot(NamedTuple):
+    """
+    Immutable snapshot of the agent's fields that the search changes (see Agent.get_agent_state).
+    Holds numbers only, the location is a vertex id, so it is used as is in state keys.
+    """
+    loc: int
+    time: float
+    n_saved: int
+    n_carrying: int
+    penalty: int
+    terminated: bool
 
 
 class Agent:
@@ -86,16 +98,14 @@ class Agent:
         if not self.is_reachable(env, v, verbose=True):
             self.terminate(env)
             return
-
-        def goto_node():
-            self.goto(env, v)
         end_time = self.goto_duration(env, v)
         goto_action = Action(
             agent=self,
             action_type=ActionType.GOTO,
-            description='{}: Go from {} to {} (end_time: {})'.format(self.name, self.loc, v.label, end_time),
-            callback=goto_node,
-            end_time=end_time
+            target=v,
+            end_time=end_time,
+            template='{}: Go from {} to {} (end_time: {})',
+            args=(self.name, self.loc, v.label, end_time)
         )
         self.goto_str = '->{}'.format(v)
         self.register_action(env, goto_action)
@@ -112,21 +122,22 @@ class Agent:
             return
         if v.is_shelter():
             if self.n_carrying > 0:
-                debug('Dropped off {.n_carrying} people'.format(self))
+                debug('Dropped off {.n_carrying} people', self)
                 self.n_saved += self.n_carrying
                 self.n_carrying = 0
         elif not v.evacuated:
-            debug('Picked up {} people'.format(v.n_people))
+            debug('Picked up {} people', v.n_people)
             self.n_carrying += v.n_people
             v.evacuated = True
             v.n_people = 0
-            env.require_evac_nodes.remove(v)
+            env.mark_evacuated(v)
 
     def terminate(self, env: Environment):
         terminate_action = Action(
             agent=self,
             action_type=ActionType.TERMINATE,
-            description='Terminating {}. Score = {}'.format(self.name, self.get_score())
+            template='Terminating {}. Score = {}',
+            args=(self.name, self.get_score())
         )
         self.register_action(env, terminate_action)
         self.penalty = self.n_carrying + Configurator.base_penalty
@@ -153,11 +164,12 @@ class Agent:
         print(self.summary())
 
     def get_agent_state(self):
-        return shallow_copy(self)
+        return AgentSnapshot(self.loc.id, self.time, self.n_saved, self.n_carrying, self.penalty, self.terminated)
 
-    def update(self, other):
-        for k, v in other.__dict__.items():
-            setattr(self, k, v)
+    def update(self, snapshot: AgentSnapshot, G):
+        """restores the fields of a snapshot taken by get_agent_state. G: the graph of the snapshot's location"""
+        self.loc = G.vertex_list[snapshot.loc]
+        _, self.time, self.n_saved, self.n_carrying, self.penalty, self.terminated = snapshot
 
     def __hash__(self):
         return hash(repr(self))
@@ -11,12 +11,13 @@ class Greedy(Agent):
         if not self.is_available(env):
             return
         s = self.loc
-        env.G.dijkstra(s)
-        targets = self.get_targets(env, s)
-        targets_by_priority = sorted(targets, key=lambda v: (v.d, v.label), reverse=True)
+        # targets that cannot be reached by their deadline (given the edge deadlines on the way) are skipped
+        arrival = env.G.earliest_arrival(s, self.time)
+        targets = [v for v in self.get_targets(env, s) if arrival.distance(v) < float('inf')]
+        targets_by_priority = sorted(targets, key=lambda v: (arrival.distance(v), v.label), reverse=True)
         if targets_by_priority:
             target = targets_by_priority.pop()
-            next_node = env.G.shortest_path_successor(s, target)
+            next_node = env.G.vertex_list[arrival.first_hop(target)]
             self.goto2(env, next_node)
         else:
             self.terminate(env)
@@ -67,7 +68,7 @@ class Vandal(Agent):
         if not self.is_available(env):
             return
 
-        debug("# NOOPS left: {}".format(self.noop_counter))
+        debug("# NOOPS left: {}", self.noop_counter)
         if self.noop_counter != 0:
             self.noop_counter -= 1
             self.no_op(env)
@@ -107,19 +108,17 @@ class Vandal(Agent):
     def block(self, env: Environment, e: Edge):
         """ block the accessible road with the lowest weight, i.e remove it from graph """
         env.G.block_edge(e.v1, e.v2, block_time=self.time)
-        env.blocked_edges.add(e)
         self.n_blocked += 1
 
     def register_block_edge_callback(self, env: Environment, e:Edge):
-        def block_edge():
-            self.block(env, e)
         end_time = (self.time + 1)
         block_action = Action(
             agent=self,
             action_type=ActionType.BLOCK,
-            description='{0}: Blocking ({e.v1},{e.v2}) (end time:{end})'.format(self.name, e=e, end=end_time),
-            callback=block_edge,
-            end_time=end_time
+            target=e,
+            end_time=end_time,
+            template='{}: Blocking ({},{}) (end time:{})',
+            args=(self.name, e.v1, e.v2, end_time)
         )
         self.register_action(env, block_action)
 
@@ -134,7 +133,8 @@ class Vandal(Agent):
         self.register_action(env, Action(
             agent=self,
             action_type=ActionType.NO_OP,
-            description='{.name}: NO_OP'.format(self),
+            template='{}: NO_OP',
+            args=(self.name,),
             end_time=(self.time + 1)
         ))
 
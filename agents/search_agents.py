@@ -1,27 +1,70 @@
 from environment import Environment, EvacuateNode
 from utils.data_structures import Stack
 from agents.base_agents import Human
-from search_tree import SearchTree
+from search_tree import SearchTree, SMAStarTree, BeamSearchTree
+from heuristic_pool import HeuristicPool
+import os
+import pickle
+from time import perf_counter
 from configurator import Configurator, debug
-from action import Action
+from utils.profiler import Profiler
+from action import Action, ActionType
 
 
 class SearchAgent(Human):
     """Base class for search agents"""
+    keep_tree = False  # keep the search tree after devising a strategy
 
     def __init__(self, name, start_loc: EvacuateNode, max_expand=float('inf')):
         super().__init__(name, start_loc)
         self.strategy: Stack[Action] = Stack()
         self.max_expand = max_expand
+        self.graph_search = Configurator.graph_search
+        self.time_budget = Configurator.time_budget  # wall-clock planning time per strategy in ms (None: unbounded)
+        self.workers = Configurator.workers  # heuristic evaluation processes (0: serial)
+        # search statistics, accumulated over all strategies
+        self.expand_count = 0
+        self.n_heuristic_calls = 0
+        self.planning_time = 0.0  # seconds
+        self.max_planning_time = 0.0  # seconds, of the slowest strategy
+        self.peak_fringe_size = 0  # largest fringe of all the searches
+        self.profile = None  # phase timings of the last strategy (see utils.profiler)
+        self.tree: SearchTree = None  # the last search tree, if keep_tree is set
 
     def get_strategy(self, env: Environment):
+        """:return: the profiling report of the search, if profiling is enabled and a new strategy was devised"""
         if not self.strategy.is_empty():
             return  # strategy already exists
+        Profiler.reset()
+        tree = self.kept_tree(env)  # matched before T is charged, the kept tree's root has the agent's current time
         # performance measure - account for tree expansion time constant T
         self.time += self.max_expand * Configurator.T
-        expand_count, self.strategy = SearchTree(env, self).tree_search(max_expand=self.max_expand)
-        debug('expand count = {}'.format(expand_count))
+        deadline = None if self.time_budget is None else perf_counter() + self.time_budget / 1000
+        if tree is None:
+            tree = self.get_search_tree(env)
+        tree.pool = HeuristicPool.get(env.G, self.workers) if self.workers else None
+        n_heuristic_calls = tree.n_heuristic_calls  # a kept tree counts the calls of all its searches
+        expand_count, self.strategy = tree.tree_search(max_expand=self.max_expand, deadline=deadline)
+        self.tree = tree if self.keep_tree else None
+        self.expand_count += expand_count
+        self.n_heuristic_calls += tree.n_heuristic_calls - n_heuristic_calls
+        self.planning_time += tree.elapsed
+        self.max_planning_time = max(self.max_planning_time, tree.elapsed)
+        self.peak_fringe_size = max(self.peak_fringe_size, tree.peak_fringe_size)
+        debug('expand count = {}, planning time = {:.1f}ms, peak fringe size = {}',
+              expand_count, 1000 * tree.elapsed, tree.peak_fringe_size)
+        if Profiler.enabled:
+            self.profile = Profiler.collect(agent=self.name, time=env.time, expand_count=expand_count)
         self.describe_strategy()
+        return self.profile
+
+    def kept_tree(self, env: Environment):
+        """returns the previous decision's search tree to continue the search in, None to start a new one"""
+        return None
+
+    def get_search_tree(self, env: Environment):
+        """returns the search tree to devise a strategy with, rooted at the current state"""
+        return SearchTree(env, self, self.graph_search)
 
     def describe_strategy(self):
         print('\nStrategy for {}:'.format(self.name))
@@ -35,7 +78,15 @@ class SearchAgent(Human):
             return
         if self.strategy.is_empty():
             self.get_strategy(env)
-        self.strategy.pop().execute()
+        self.start(env, self.strategy.pop())
+
+    def start(self, env: Environment, action: Action):
+        """starts a planned action of the strategy (see SearchTree.successor)"""
+        if action.action_type == ActionType.TERMINATE:
+            self.terminate(env)
+        else:
+            self.goto2(env, action.target)
+        print('[DONE]' + action.description)
 
 
 class GreedySearch(SearchAgent):
@@ -50,13 +101,151 @@ class AStar(SearchAgent):
         super().__init__(name, start_loc, max_expand=100000)
 
 
+class SMAStar(SearchAgent):
+    """
+    A search agent with the AStar expansions limit, keeping at most Configurator.memory_limit plans in its fringe
+    (see SMAStarTree). Its strategies are optimal when the limit allows it
+    """
+    def __init__(self, name, start_loc: EvacuateNode):
+        super().__init__(name, start_loc, max_expand=100000)
+        self.memory_limit = Configurator.memory_limit
+
+    def get_search_tree(self, env: Environment):
+        return SMAStarTree(env, self, self.memory_limit)
+
+
+class BeamSearch(SearchAgent):
+    """
+    A search agent that keeps only the best Configurator.beam_width plans of each level of its search tree
+    (see BeamSearchTree), for a bounded cost and memory per strategy
+    """
+    def __init__(self, name, start_loc: EvacuateNode):
+        super().__init__(name, start_loc, max_expand=100000)
+        self.beam_width = Configurator.beam_width
+
+    def get_search_tree(self, env: Environment):
+        return BeamSearchTree(env, self, self.beam_width)
+
+
 class RTAStar(SearchAgent):
     """A search agent that expands a limited number of nodes at a time in a search tree when devising a strategy"""
+    keep_tree = True
+
     def __init__(self, name, start_loc: EvacuateNode):
         super().__init__(name, start_loc, max_expand=Configurator.limit)
 
+    def kept_tree(self, env: Environment):
+        """reuses the previous decision's search tree if the environment reached the state it was re-rooted at"""
+        if self.tree is None or self.tree.root.state.key() != env.get_state(self).key():
+            return None
+        return self.tree
+
     def act(self, env: Environment):
-        """RTA* does only one move at a time and then recalculates from scratch"""
+        """
+        RTA* does only one move at a time and then recalculates.
+        the search tree is re-rooted at the state the move leads to, keeping the expansions below it
+        """
+        if not self.is_available(env):
+            return
         super().act(env)
         while not self.strategy.is_empty():
             self.strategy.pop()
+        step = self.tree.first_step()
+        if step is None:
+            self.tree = None
+        else:
+            self.tree.reroot(step)
+
+
+class LRTAStar(SearchAgent):
+    """
+    A learning real-time A* agent: like RTAStar, it does one move at a time and then recalculates.
+    heuristic values backed up by each search are kept in a table by state key, which is shared by the agents of a
+    simulation. tables are saved to (and loaded from) Configurator.h_table_dir by configuration file, base penalty,
+    vandals (with their number of no-ops) and T, which is the only way they are shared between simulations
+    """
+    keep_tree = True
+    h_tables = {}  # (configuration path, base penalty, vandal no-ops, T) -> learned heuristic table of the simulation
+
+    def __init__(self, name, start_loc: EvacuateNode):
+        super().__init__(name, start_loc, max_expand=Configurator.limit)
+        self.h_table = None  # loaded on the first search, when the vandals are known
+
+    @staticmethod
+    def vandal_no_ops(env: Environment):
+        """:return: the vandals' number of no-ops, None if there are no vandals (learned values depend on both)"""
+        return Configurator.v_no_ops if any(agent.is_vandal() for agent in env.agents) else None
+
+    @staticmethod
+    def h_table_path(env: Environment):
+        """:return: the file of the configuration's learned table, None if tables are not saved"""
+        if Configurator.h_table_dir is None:
+            return None
+        v_no_ops = LRTAStar.vandal_no_ops(env)
+        return os.path.join(Configurator.h_table_dir, '{}.K{}.{}.T{}.h.pkl'.format(
+            os.path.basename(Configurator.graph_path), Configurator.base_penalty,
+            'no_vandals' if v_no_ops is None else 'V{}'.format(v_no_ops), Configurator.T))
+
+    def load_h_table(self, env: Environment):
+        if Configurator.graph_path == 'random':
+            return {}  # nothing to share with other runs
+        key = Configurator.graph_path, Configurator.base_penalty, self.vandal_no_ops(env), Configurator.T
+        if key not in LRTAStar.h_tables:
+            path = self.h_table_path(env)
+            if path is not None and os.path.exists(path):
+                with open(path, 'rb') as f:
+                    LRTAStar.h_tables[key] = pickle.load(f)
+                debug('loaded {} learned heuristic values from {}', len(LRTAStar.h_tables[key]), path)
+            else:
+                LRTAStar.h_tables[key] = {}
+        return LRTAStar.h_tables[key]
+
+    def save_h_table(self, env: Environment):
+        path = self.h_table_path(env)
+        if path is None or Configurator.graph_path == 'random':
+            return
+        os.makedirs(Configurator.h_table_dir, exist_ok=True)
+        with open(path + '.tmp', 'wb') as f:
+            pickle.dump(self.h_table, f)
+        os.replace(path + '.tmp', path)
+
+    def get_search_tree(self, env: Environment):
+        if self.h_table is None:
+            self.h_table = self.load_h_table(env)
+        return SearchTree(env, self, self.graph_search, self.h_table)
+
+    def get_strategy(self, env: Environment):
+        if not self.strategy.is_empty():
+            return  # strategy already exists
+        profile = super().get_strategy(env)
+        self.learn(self.tree)
+        self.tree = None
+        return profile
+
+    def learn(self, tree: SearchTree):
+        """
+        LRTA* update over the search tree: the cost of an expanded node is raised to the minimal cost of its
+        children (deepest nodes first), and h(n) = cost(n) - g(n) is stored, where g is the agent's penalty.
+        the costs of leaf nodes are stored as well, so they are not computed again.
+        """
+        expanded = tree.hist[:-1]  # the last extracted option was not expanded
+        leaves = list(tree.fringe) + [tree.last_option]
+        cost = {plan: plan.cost for plan in leaves}
+        children = {plan: [] for plan in expanded}
+        for plan in expanded + leaves:
+            if plan.parent in children:
+                children[plan.parent].append(plan)
+        for plan in sorted(expanded, key=lambda p: p.depth, reverse=True):
+            cost[plan] = max(plan.cost, min([cost[child] for child in children[plan]], default=plan.cost))
+        for plan, backed_up_cost in cost.items():
+            if not plan.state.is_goal():
+                self.h_table[plan.state.key()] = backed_up_cost - plan.state.agent_state.penalty
+
+    def act(self, env: Environment):
+        """LRTA* does only one move at a time and then recalculates, using the learned heuristic values"""
+        super().act(env)
+        while not self.strategy.is_empty():
+            self.strategy.pop()
+        if self.terminated:
+            self.save_h_table(env)
+
@@ -0,0 +1,113 @@
+"""
+Headless batch runner: runs a grid of simulations in a process pool and writes per-agent results to a file.
+example: python3 batch_runner.py -g tests/*.config --random 10 -a AStar RTAStar+Vandal -K 2 5 -L 5 10 -o results.csv
+"""
+import os
+import csv
+import json
+import random
+import argparse
+import contextlib
+from glob import glob
+from time import perf_counter
+from itertools import product
+from concurrent.futures import ProcessPoolExecutor
+from configurator import Configurator
+from hurricane_simulator import Simulator
+from agents.base_agents import Human, Greedy, Vandal
+from agents.search_agents import GreedySearch, RTAStar, AStar, LRTAStar, SMAStar, BeamSearch
+
+AGENT_TYPES = {agent_type.__name__: agent_type for agent_type in [Human, Greedy, Vandal, GreedySearch, RTAStar, AStar, LRTAStar, SMAStar, BeamSearch]}
+RESULT_FIELDS = ['run', 'graph_path', 'seed', 'agents', 'K', 'V', 'L', 'T', 'agent', 'score', 'n_saved', 'penalty',
+                 'expand_count', 'n_heuristic_calls', 'peak_fringe_size', 'planning_time', 'sim_time', 'wall_time', 'error']
+
+
+def init_worker(config_args):
+    """configures a worker process for headless runs"""
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        Configurator.get_user_config(config_args + ['--log_level', 'SILENT'])
+    Configurator.interactive = Configurator.view_strategy = False
+    Configurator.debug = True  # human agents choose randomly in debug mode
+
+
+def run_simulation(run):
+    """runs a single simulation, returns a result record for each agent"""
+    base_record = {k: run[k] for k in ['run', 'graph_path', 'seed', 'agents', 'K', 'V', 'L', 'T']}
+    Configurator.graph_path = run['graph_path']
+    Configurator.limit = run['L']
+    Configurator.T = run['T']
+    LRTAStar.h_tables.clear()  # runs share learned tables only through the h_table_dir files
+    random.seed(run['seed'])
+    start = perf_counter()
+    try:
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            sim = Simulator(save_random_config=False)
+            # random configurations draw their own constants, the grid values override them
+            Configurator.base_penalty, Configurator.v_no_ops = run['K'], run['V']
+            sim.run_simulation([AGENT_TYPES[name] for name in run['agents'].split('+')])
+    except Exception as e:
+        return [dict(base_record, wall_time=perf_counter() - start, error=repr(e))]
+    wall_time = perf_counter() - start
+    return [dict(base_record,
+                 agent=agent.name,
+                 score=agent.get_score(),
+                 n_saved=agent.n_saved,
+                 penalty=agent.penalty,
+                 expand_count=getattr(agent, 'expand_count', 0),
+                 n_heuristic_calls=getattr(agent, 'n_heuristic_calls', 0),
+                 peak_fringe_size=getattr(agent, 'peak_fringe_size', 0),
+                 planning_time=getattr(agent, 'planning_time', 0.0),
+                 sim_time=sim.env.time,
+                 wall_time=wall_time)
+            for agent in sim.env.agents]
+
+
+def get_runs(args):
+    graphs = [(path, args.seed) for path in args.graph_paths] + \
+             [('random', args.seed + i) for i in range(args.random)]
+    grid = product(graphs, args.agents, args.base_penalty, args.v_no_ops, args.limit, args.T)
+    return [dict(run=i, graph_path=graph_path, seed=seed, agents=agents, K=K, V=V, L=L, T=T)
+            for i, ((graph_path, seed), agents, K, V, L, T) in enumerate(grid)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='''
+    Headless batch runner for the Hurricane Evacuation Problem simulator.
+    Runs every combination of the given graphs, agent groups and constants.''')
+    parser.add_argument('-g', '--graph_paths',  default=[], nargs='*',               help='graph configuration files')
+    parser.add_argument('-r', '--random',       default=0,        type=int,            help='number of random graphs to generate')
+    parser.add_argument('-a', '--agents',       default=['AStar'], nargs='+',          help='agent groups, e.g. AStar RTAStar+Vandal')
+    parser.add_argument('-K', '--base_penalty', default=[2],      type=int, nargs='+', help='base penalty values')
+    parser.add_argument('-V', '--v_no_ops',     default=[1],      type=int, nargs='+', help='vandal no-ops values')
+    parser.add_argument('-L', '--limit',        default=[5],      type=int, nargs='+', help='real-time A* expansion limit values')
+    parser.add_argument('-T',                   default=[0.0],    type=float, nargs='+', help='expansion time unit values')
+    parser.add_argument('-s', '--seed',         default=0,        type=int,            help='random seed (random graphs use seed, seed+1, ...)')
+    parser.add_argument('-w', '--workers',      default=os.cpu_count(), type=int,      help='number of worker processes')
+    parser.add_argument('-o', '--output',       default='results.jsonl',               help='results file (.csv or .jsonl)')
+    parser.add_argument('-c', '--config_args',  default='',                            help='extra simulator arguments, e.g. "-b csr --graph_search"')
+    args = parser.parse_args()
+    for group in args.agents:
+        for name in group.split('+'):
+            if name not in AGENT_TYPES:
+                parser.error('unknown agent type: {}'.format(name))
+    args.graph_paths = [path for pattern in args.graph_paths for path in sorted(glob(pattern))]
+
+    runs = get_runs(args)
+    print('running {} simulations on {} workers'.format(len(runs), args.workers))
+    start = perf_counter()
+    with open(args.output, 'w', newline='') as f, \
+            ProcessPoolExecutor(args.workers, initializer=init_worker, initargs=(args.config_args.split(),)) as executor:
+        writer = csv.DictWriter(f, RESULT_FIELDS) if args.output.endswith('.csv') else None
+        if writer:
+            writer.writeheader()
+        for records in executor.map(run_simulation, runs, chunksize=max(1, len(runs) // (4 * args.workers))):
+            for record in records:
+                if writer:
+                    writer.writerow(record)
+                else:
+                    f.write(json.dumps(record) + '\n')
+    print('done in {:.1f}s, results written to {}'.format(perf_counter() - start, args.output))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,52 @@
+"""
+Beam search quality/latency trade-off: total score, expansions, planning time (total and worst strategy) and peak
+fringe size of BeamSearch agents with growing beam widths vs. AStar, on configuration files and random graphs.
+example: python3 -m benchmarks.beam_benchmark -g tests/*.config -n 16 32 -W 1 4 16
+"""
+import argparse
+from glob import glob
+from configurator import Configurator
+from benchmarks.simulation import simulate
+from agents.search_agents import AStar, BeamSearch
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Beam search quality/latency benchmark')
+    parser.add_argument('-g', '--graph_paths', default=sorted(glob('tests/*.config')), nargs='*', help='configuration files')
+    parser.add_argument('-n', '--n_vertices',  default=[16, 32], type=int, nargs='*', help='random graph sizes')
+    parser.add_argument('-W', '--widths',      default=[1, 4, 16, 64], type=int, nargs='+', help='beam widths')
+    parser.add_argument('--avg_degree',        default=3,     type=int,   help='average vertex degree of random graphs')
+    parser.add_argument('-s', '--seeds',       default=3,     type=int,   help='random graphs per size')
+    parser.add_argument('--no_astar',          action='store_true', help='skip AStar (slow on large graphs)')
+    args = parser.parse_args()
+    Configurator.get_user_config(['--log_level', 'SILENT', '--avg_degree', str(args.avg_degree)])
+    Configurator.interactive = Configurator.view_strategy = False
+
+    suites = [('tests/*.config', [(path, None, 0) for path in args.graph_paths])]
+    suites += [('random |V|={}'.format(n), [('random', n, seed) for seed in range(args.seeds)])
+               for n in args.n_vertices]
+    runs = [] if args.no_astar else [('AStar', AStar, None)]
+    runs += [('BeamSearch W={}'.format(width), BeamSearch, width) for width in args.widths]
+    print('{:<16} {:<16} {:>7} {:>10} {:>14} {:>14} {:>12}'.format(
+        'graphs', 'agent', 'score', 'expanded', 'planning[ms]', 'worst plan[ms]', 'peak fringe'))
+    for suite, graphs in suites:
+        if not graphs:
+            continue
+        for label, agent_type, width in runs:
+            if width is not None:
+                Configurator.beam_width = width
+            score = expanded = peak_fringe = 0
+            planning_time = worst = 0.0
+            for graph_path, n_vertices, seed in graphs:
+                agent = simulate([agent_type], graph_path, n_vertices, seed).env.agents[0]
+                score += agent.get_score()
+                expanded += agent.expand_count
+                planning_time += agent.planning_time
+                worst = max(worst, agent.max_planning_time)
+                peak_fringe = max(peak_fringe, agent.peak_fringe_size)
+            print('{:<16} {:<16} {:>7} {:>10} {:>14.1f} {:>14.1f} {:>12}'.format(
+                suite, label, score, expanded, 1000 * planning_time, 1000 * worst, peak_fringe))
+
+
+if __name__ == '__main__':
+    main()
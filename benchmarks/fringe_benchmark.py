@@ -0,0 +1,77 @@
+"""
+Fringe priority queue benchmark: BucketQueue vs. IndexedHeap as the search tree's fringe. A synthetic search-like
+workload (expand the best plan, insert its children with small integer costs) times the queue operations alone, and
+AStar simulations on random graphs compare expansions, score and planning time with each fringe type.
+example: python3 -m benchmarks.fringe_benchmark -N 10000 100000 -n 16 32
+"""
+import random
+import argparse
+from time import perf_counter
+from configurator import Configurator
+from benchmarks.simulation import simulate
+from search_tree import SearchTree
+from agents.search_agents import AStar
+from utils.data_structures import BucketQueue, IndexedHeap
+
+QUEUE_TYPES = [IndexedHeap, BucketQueue]
+
+
+class Item:
+    """a fringe plan stand-in, ordered as Plan"""
+    def __init__(self, cost, depth):
+        self.cost = cost
+        self.depth = depth
+
+    def __lt__(self, other):
+        return (self.cost, other.depth) < (other.cost, self.depth)
+
+
+def synthetic(queue_type, n_expansions, branching, seed):
+    """:return: seconds spent expanding n_expansions items, each child costing its parent's cost plus 0-2"""
+    rand = random.Random(seed)
+    children = [[rand.randrange(3) for _ in range(branching)] for _ in range(n_expansions)]
+    start = perf_counter()
+    fringe = queue_type([Item(0, 0)])
+    for increments in children:
+        item = fringe.extract_min()
+        for increment in increments:
+            fringe.insert(Item(item.cost + increment, item.depth + 1))
+    return perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Fringe priority queue benchmark')
+    parser.add_argument('-N', '--n_expansions', default=[10000, 100000], type=int, nargs='*', help='synthetic expansions')
+    parser.add_argument('-B', '--branching',   default=4,     type=int,   help='synthetic children per expansion')
+    parser.add_argument('-n', '--n_vertices',  default=[16, 32], type=int, nargs='*', help='random graph sizes')
+    parser.add_argument('--avg_degree',        default=3,     type=int,   help='average vertex degree of random graphs')
+    parser.add_argument('-s', '--seeds',       default=3,     type=int,   help='random graphs per size')
+    args = parser.parse_args()
+
+    print('{:<12} {:>10} {:>12} {:>17}'.format('fringe', 'expansions', 'time[ms]', 'per expansion[us]'))
+    for n in args.n_expansions:
+        for queue_type in QUEUE_TYPES:
+            elapsed = synthetic(queue_type, n, args.branching, seed=0)
+            print('{:<12} {:>10} {:>12.1f} {:>17.2f}'.format(queue_type.__name__, n, 1000 * elapsed, 1e6 * elapsed / n))
+
+    if not args.n_vertices:
+        return
+    Configurator.get_user_config(['--log_level', 'SILENT', '--avg_degree', str(args.avg_degree)])
+    Configurator.interactive = Configurator.view_strategy = False
+    print('\n{:<12} {:>5} {:>10} {:>8} {:>14}'.format('fringe', '|V|', 'expanded', 'score', 'planning[ms]'))
+    for n in args.n_vertices:
+        for queue_type in QUEUE_TYPES:
+            SearchTree.priority_queue = queue_type
+            expanded = score = 0
+            planning_time = 0.0
+            for seed in range(args.seeds):
+                agent = simulate([AStar], n_vertices=n, seed=seed).env.agents[0]
+                expanded += agent.expand_count
+                score += agent.get_score()
+                planning_time += agent.planning_time
+            print('{:<12} {:>5} {:>10} {:>8} {:>14.1f}'.format(
+                queue_type.__name__, n, expanded, score, 1000 * planning_time))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,52 @@
+"""
+Graph backend benchmark: memory and lookup cost of the dict-based Graph vs. the CSR-based CSRGraph.
+example: python3 -m benchmarks.graph_backend_benchmark -n 10000 50000
+"""
+import argparse
+import random
+import tracemalloc
+from time import perf_counter
+from utils.data_structures import Graph, CSRGraph
+from benchmarks.heap_benchmark import random_graph
+
+
+def measure(graph_type, n_vertices, n_lookups):
+    tracemalloc.start()
+    G = random_graph(graph_type, n_vertices)
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    V = list(G.get_vertices())
+    rand = random.Random(2)
+    pairs = [(u, rand.choice(G.neighbours(u))) for u in rand.choices(V, k=n_lookups)]
+
+    start = perf_counter()
+    for u, v in pairs:
+        G.get_edge(u, v)
+    get_edge_time = perf_counter() - start
+    start = perf_counter()
+    for u, v in pairs:
+        G.neighbours(u)
+    neighbours_time = perf_counter() - start
+    start = perf_counter()
+    G.dijkstra(V[0])
+    dijkstra_time = perf_counter() - start
+    return memory, get_edge_time, neighbours_time, dijkstra_time
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Graph storage backends benchmark')
+    parser.add_argument('-n', '--n_vertices', default=[10000, 50000], type=int, nargs='+', help='graph sizes (|E| = 2|V|)')
+    parser.add_argument('-l', '--lookups',    default=100000, type=int, help='number of get_edge/neighbours lookups')
+    args = parser.parse_args()
+
+    print('{:>8} {:>10} {:>12} {:>13} {:>15} {:>13}'.format(
+        '|V|', 'backend', 'memory[MB]', 'get_edge[s]', 'neighbours[s]', 'dijkstra[s]'))
+    for n in args.n_vertices:
+        for graph_type in [Graph, CSRGraph]:
+            memory, get_edge_time, neighbours_time, dijkstra_time = measure(graph_type, n, args.lookups)
+            print('{:>8} {:>10} {:>12.1f} {:>13.3f} {:>15.3f} {:>13.3f}'.format(
+                n, graph_type.__name__, memory / 2**20, get_edge_time, neighbours_time, dijkstra_time))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,58 @@
+"""
+Tree search vs. graph search (closed set + fringe duplicate detection) with the A* expansion limit:
+number of expansions and heuristic calls saved, per configuration file and start shelter.
+example: python3 -m benchmarks.graph_search_benchmark -g tests/*.config
+"""
+import argparse
+import contextlib
+import io
+from glob import glob
+from configurator import Configurator
+from hurricane_simulator import Simulator
+from search_tree import SearchTree
+from agents.search_agents import AStar
+
+
+def plan(config_path, start_label, graph_search):
+    """plans a strategy for an A* agent starting at start_label, returns the search tree"""
+    Configurator.graph_path = config_path
+    with contextlib.redirect_stdout(io.StringIO()):
+        sim = Simulator()
+        start = [v for v in sim.G.get_vertices() if v.label == start_label][0]
+        agent = AStar('AStar', start)
+        sim.env.agents.append(agent)
+        start.agents.add(agent)
+        tree = SearchTree(sim.env, agent, graph_search)
+        tree.expand_count, strategy = tree.tree_search(max_expand=agent.max_expand)
+    return tree
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Tree search vs. graph search benchmark')
+    parser.add_argument('-g', '--graph_paths', default=sorted(glob('tests/*.config')), nargs='+', help='configuration files')
+    args = parser.parse_args()
+    Configurator.get_user_config(['--log_level', 'SILENT'])
+    Configurator.interactive = Configurator.view_strategy = False
+
+    print('{:<32} {:>5} {:>14} {:>14} {:>18} {:>18}'.format(
+        'config', 'start', 'tree expanded', 'graph expanded', 'tree h() calls', 'graph h() calls'))
+    totals = [0, 0, 0, 0]
+    for config_path in args.graph_paths:
+        Configurator.graph_path = config_path
+        with contextlib.redirect_stdout(io.StringIO()):
+            shelters = [v.label for v in Simulator().G.get_vertices() if v.is_shelter()]
+        for start_label in shelters:
+            tree, graph = plan(config_path, start_label, False), plan(config_path, start_label, True)
+            counts = [tree.expand_count, graph.expand_count, tree.n_heuristic_calls, graph.n_heuristic_calls]
+            totals = [total + count for total, count in zip(totals, counts)]
+            print('{:<32} {:>5} {:>14} {:>14} {:>18} {:>18}{}'.format(
+                config_path, start_label, *counts,
+                '' if tree.solution.cost == graph.solution.cost else ' (solution cost {} vs. {})'.format(
+                    tree.solution.cost, graph.solution.cost)))
+    print('saved {} of {} expansions ({:.1%}) and {} of {} heuristic calls ({:.1%})'.format(
+        totals[0] - totals[1], totals[0], 1 - totals[1] / max(totals[0], 1),
+        totals[2] - totals[3], totals[2], 1 - totals[3] / max(totals[2], 1)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,56 @@
+"""
+Dijkstra micro-benchmark: IndexedHeap vs. the original Heap (O(n) decrease_key) as dijkstra's priority queue.
+example: python3 -m benchmarks.heap_benchmark -n 1000 10000 100000 --legacy_limit 3000
+"""
+import argparse
+import random
+from time import perf_counter
+from utils.data_structures import Node, Edge, Graph, Heap, IndexedHeap
+
+
+class LegacyGraph(Graph):
+    priority_queue = Heap
+
+
+def random_graph(graph_type, n_vertices, avg_degree=4, seed=0):
+    """creates a connected graph: a random spanning tree plus random edges up to the requested average degree"""
+    rand = random.Random(seed)
+    V = [Node('V{}'.format(i)) for i in range(n_vertices)]
+    E = {}
+    for i in range(1, n_vertices):
+        j = rand.randrange(i)
+        E[j, i] = Edge(V[j], V[i], rand.randint(1, 10))
+    while len(E) < n_vertices * avg_degree // 2:
+        i, j = sorted(rand.sample(range(n_vertices), 2))
+        if (i, j) not in E:
+            E[i, j] = Edge(V[i], V[j], rand.randint(1, 10))
+    return graph_type(V, list(E.values()))
+
+
+def time_dijkstra(G, n_runs):
+    sources = random.Random(1).sample(list(G.get_vertices()), n_runs)
+    start = perf_counter()
+    for s in sources:
+        G.dijkstra(s)
+    return (perf_counter() - start) / n_runs
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Dijkstra priority queue micro-benchmark')
+    parser.add_argument('-n', '--n_vertices',  default=[1000, 10000, 100000], type=int, nargs='+', help='graph sizes')
+    parser.add_argument('-r', '--runs',        default=3,    type=int, help='dijkstra runs per graph')
+    parser.add_argument('--legacy_limit',      default=3000, type=int, help='largest graph to run the original Heap on')
+    args = parser.parse_args()
+
+    print('{:>10} {:>16} {:>16} {:>9}'.format('|V|', 'IndexedHeap[s]', 'Heap[s]', 'speedup'))
+    for n in args.n_vertices:
+        indexed = time_dijkstra(random_graph(Graph, n), args.runs)
+        legacy = time_dijkstra(random_graph(LegacyGraph, n), args.runs) if n <= args.legacy_limit else None
+        print('{:>10} {:>16.4f} {:>16} {:>9}'.format(
+            n, indexed,
+            '-' if legacy is None else '{:.4f}'.format(legacy),
+            '-' if legacy is None else '{:.1f}x'.format(legacy / indexed)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+"""
+Search tree memory benchmark: memory and allocated blocks retained per search tree node by an AStar tree_search
+(traced with tracemalloc), and the size of single Plan, Action, State, agent snapshot, node and edge objects.
+The graph's shortest paths caches are warmed up by an untraced search first, so only the tree is measured.
+example: python3 -m benchmarks.memory_benchmark -g tests/*.config -n 16 32
+"""
+import sys
+import argparse
+import contextlib
+import io
+import tracemalloc
+from glob import glob
+from configurator import Configurator
+from benchmarks.simulation import create_simulator
+from search_tree import SearchTree
+from agents.search_agents import AStar
+
+
+def object_size(obj):
+    """size in bytes of an object and its attributes dict, if it has one"""
+    return sys.getsizeof(obj) + (sys.getsizeof(obj.__dict__) if hasattr(obj, '__dict__') else 0)
+
+
+def measure(graph_path, n_vertices, seed, max_expand):
+    """:return: (expansions, tree nodes, retained bytes, retained blocks, {object type: size}) of a traced search"""
+    sim = create_simulator(graph_path, n_vertices, seed)
+    with contextlib.redirect_stdout(io.StringIO()):
+        sim.init_agents([AStar])
+        agent = sim.env.agents[0]
+        SearchTree(sim.env, agent).tree_search(max_expand)
+        tracemalloc.start()
+        tree = SearchTree(sim.env, agent)
+        expand_count, _ = tree.tree_search(max_expand)
+        snapshot = tracemalloc.take_snapshot()
+        tracemalloc.stop()
+    stats = snapshot.statistics('filename')
+    plans = tree.hist + list(tree.fringe)
+    plan = plans[-1]
+    sizes = dict(Plan=object_size(plan), Action=object_size(plan.action), State=object_size(plan.state),
+                 AgentSnapshot=object_size(plan.state.agent_state),
+                 Node=object_size(sim.G.vertex_list[0]), Edge=object_size(next(iter(sim.G.get_edges()))))
+    return expand_count, len(plans), sum(stat.size for stat in stats), sum(stat.count for stat in stats), sizes
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Search tree memory benchmark')
+    parser.add_argument('-g', '--graph_paths', default=sorted(glob('tests/*.config')), nargs='*', help='configuration files')
+    parser.add_argument('-n', '--n_vertices',  default=[16, 32], type=int, nargs='*', help='random graph sizes')
+    parser.add_argument('--avg_degree',        default=3,     type=int,   help='average vertex degree of random graphs')
+    parser.add_argument('-s', '--seeds',       default=3,     type=int,   help='random graphs per size')
+    parser.add_argument('-m', '--max_expand',  default=2000,  type=int,   help='expansions limit of the search')
+    args = parser.parse_args()
+    Configurator.get_user_config(['--log_level', 'SILENT', '--avg_degree', str(args.avg_degree)])
+    Configurator.interactive = Configurator.view_strategy = False
+
+    graphs = [(path, path, None, 0) for path in args.graph_paths]
+    graphs += [('random |V|={} #{}'.format(n, seed), 'random', n, seed) for n in args.n_vertices for seed in range(args.seeds)]
+    print('{:<32} {:>9} {:>7} {:>12} {:>10} {:>12}'.format(
+        'graph', 'expanded', 'nodes', 'memory[KB]', 'bytes/node', 'blocks/node'))
+    total_nodes = total_bytes = total_blocks = 0
+    sizes = {}
+    for label, graph_path, n_vertices, seed in graphs:
+        expanded, n_nodes, n_bytes, n_blocks, sizes = measure(graph_path, n_vertices, seed, args.max_expand)
+        total_nodes, total_bytes, total_blocks = total_nodes + n_nodes, total_bytes + n_bytes, total_blocks + n_blocks
+        print('{:<32} {:>9} {:>7} {:>12.1f} {:>10.0f} {:>12.1f}'.format(
+            label, expanded, n_nodes, n_bytes / 1024, n_bytes / n_nodes, n_blocks / n_nodes))
+    if total_nodes:
+        print('{:<32} {:>9} {:>7} {:>12.1f} {:>10.0f} {:>12.1f}'.format(
+            'total', '', total_nodes, total_bytes / 1024, total_bytes / total_nodes, total_blocks / total_nodes))
+        print('object sizes [bytes]: ' + ', '.join('{}={}'.format(name, size) for name, size in sizes.items()))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,59 @@
+"""
+Parallel heuristic evaluation (--workers) scaling: wall time of a search agent's simulation on random graphs for
+growing worker counts, checking that every worker count yields the same expansions and score as the serial run.
+example: python3 -m benchmarks.parallel_benchmark -n 200 400 -w 0 1 2 4
+"""
+import argparse
+from time import perf_counter
+from configurator import Configurator
+from benchmarks.simulation import create_simulator, run_simulation
+from heuristic_pool import HeuristicPool
+import agents.search_agents as search_agents
+
+
+def simulate(agent_type, n_vertices, seed, workers):
+    """runs a single agent simulation on a random graph, returns the agent and the wall time"""
+    Configurator.workers = workers
+    sim = create_simulator(n_vertices=n_vertices, seed=seed)
+    if workers:
+        HeuristicPool.get(sim.G, workers)  # worker startup is not part of the search time
+    start = perf_counter()
+    run_simulation(sim, [agent_type])
+    elapsed = perf_counter() - start
+    HeuristicPool.shutdown_all()
+    return sim.env.agents[0], elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Parallel heuristic evaluation scaling benchmark')
+    parser.add_argument('-n', '--n_vertices',  default=[100, 200], type=int, nargs='+', help='random graph sizes')
+    parser.add_argument('-w', '--workers',     default=[0, 1, 2, 4], type=int, nargs='+', help='worker counts (0: serial)')
+    parser.add_argument('--avg_degree',        default=6,     type=int,   help='average vertex degree of random graphs')
+    parser.add_argument('-s', '--seeds',       default=2,     type=int,   help='random graphs per size')
+    parser.add_argument('-a', '--agent',       default='RTAStar', help='search agent type')
+    parser.add_argument('-L', '--limit',       default=20,    type=int,   help='RTAStar expansions limit')
+    args = parser.parse_args()
+    Configurator.get_user_config(['--log_level', 'SILENT', '-L', str(args.limit), '--avg_degree', str(args.avg_degree)])
+    Configurator.interactive = Configurator.view_strategy = False
+    agent_type = getattr(search_agents, args.agent)
+
+    print('{:<10} {:>5} {:>8} {:>12} {:>8} {:>10} {:>12} {:>8}'.format(
+        'agent', '|V|', 'workers', 'wall time[s]', 'speedup', 'expanded', 'h() calls', 'score'))
+    for n in args.n_vertices:
+        serial_time, serial_results = None, None
+        for workers in args.workers:
+            wall_time, results = 0.0, []
+            for seed in range(args.seeds):
+                agent, elapsed = simulate(agent_type, n, seed, workers)
+                wall_time += elapsed
+                results.append((agent.expand_count, agent.n_heuristic_calls, agent.get_score()))
+            if serial_time is None:
+                serial_time, serial_results = wall_time, results
+            expanded, h_calls, score = map(sum, zip(*results))
+            print('{:<10} {:>5} {:>8} {:>12.3f} {:>8.2f} {:>10} {:>12} {:>8}{}'.format(
+                args.agent, n, workers, wall_time, serial_time / wall_time, expanded, h_calls, score,
+                '' if results == serial_results else '  MISMATCH'))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,107 @@
+"""
+Search agents benchmark across random graph sizes: wall time, nodes expanded, heuristic calls, dijkstra calls (full
+and restricted runs, see Graph.n_dijkstra_calls) and peak memory of GreedySearch, RTAStar and AStar. Results can be saved as a baseline, later runs are compared against
+it and metrics that regressed beyond a threshold are flagged (exit status 1).
+example: python3 -m benchmarks.search_benchmark -n 8 16 32 --save_baseline
+         python3 -m benchmarks.search_benchmark -n 8 16 32 --threshold 0.1
+"""
+import os
+import sys
+import json
+import argparse
+import tracemalloc
+from time import perf_counter
+from configurator import Configurator
+from benchmarks.simulation import simulate
+from agents.search_agents import GreedySearch, RTAStar, AStar
+
+AGENT_TYPES = [GreedySearch, RTAStar, AStar]
+METRICS = ['wall_time', 'expand_count', 'n_heuristic_calls', 'n_dijkstra_calls', 'peak_memory']
+
+
+def measure(agent_type, n_vertices, seed, repeat):
+    """:return: the benchmark metrics of a simulation. wall time is the best of repeat runs, memory is traced separately"""
+    wall_time = float('inf')
+    for _ in range(repeat):
+        start = perf_counter()
+        sim = simulate([agent_type], n_vertices=n_vertices, seed=seed)
+        wall_time = min(wall_time, perf_counter() - start)
+    tracemalloc.start()
+    simulate([agent_type], n_vertices=n_vertices, seed=seed)
+    peak_memory = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    agent = sim.env.agents[0]
+    return dict(wall_time=wall_time,
+                expand_count=agent.expand_count,
+                n_heuristic_calls=agent.n_heuristic_calls,
+                n_dijkstra_calls=sim.G.n_dijkstra_calls,
+                peak_memory=peak_memory)
+
+
+def compare(results, baseline, threshold):
+    """:return: list of (key, metric, baseline value, new value) of metrics that grew by more than threshold"""
+    regressions = []
+    for key, metrics in results.items():
+        if key not in baseline:
+            continue
+        for metric in METRICS:
+            base, new = baseline[key][metric], metrics[metric]
+            if new > base * (1 + threshold):
+                regressions.append((key, metric, base, new))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Search agents benchmark across graph sizes')
+    parser.add_argument('-n', '--n_vertices',  default=[8, 16, 32], type=int, nargs='+', help='random graph sizes')
+    parser.add_argument('--avg_degree',        default=3,     type=int,   help='average vertex degree of random graphs')
+    parser.add_argument('-s', '--seeds',       default=3,     type=int,   help='random graphs per size')
+    parser.add_argument('-r', '--repeat',      default=1,     type=int,   help='timed runs per simulation (best is kept)')
+    parser.add_argument('-L', '--limit',       default=5,     type=int,   help='RTAStar expansions limit')
+    parser.add_argument('-b', '--backend',     default='dict', choices=['dict', 'csr'], help='graph storage backend')
+    parser.add_argument('--baseline',          default='benchmarks/search_baseline.json', help='baseline results file')
+    parser.add_argument('--save_baseline',     action='store_true', help='save the results as the new baseline')
+    parser.add_argument('--threshold',         default=0.1,   type=float, help='relative growth flagged as a regression')
+    args = parser.parse_args()
+    Configurator.get_user_config(['--log_level', 'SILENT', '-b', args.backend, '-L', str(args.limit),
+                                  '--avg_degree', str(args.avg_degree)])
+    Configurator.interactive = Configurator.view_strategy = False
+
+    # results are summed over the seeds of each (agent, size) pair
+    results = {}
+    print('{:<14} {:>5} {:>12} {:>10} {:>12} {:>10} {:>12}'.format(
+        'agent', '|V|', 'wall time[s]', 'expanded', 'h() calls', 'dijkstra', 'memory[MB]'))
+    for n in args.n_vertices:
+        for agent_type in AGENT_TYPES:
+            total = dict.fromkeys(METRICS, 0)
+            for seed in range(args.seeds):
+                for metric, value in measure(agent_type, n, seed, args.repeat).items():
+                    total[metric] += value
+            results['{}/{}'.format(agent_type.__name__, n)] = total
+            print('{:<14} {:>5} {:>12.3f} {:>10} {:>12} {:>10} {:>12.2f}'.format(
+                agent_type.__name__, n, total['wall_time'], total['expand_count'], total['n_heuristic_calls'],
+                total['n_dijkstra_calls'], total['peak_memory'] / 2**20))
+
+    run_config = dict(avg_degree=args.avg_degree, seeds=args.seeds, limit=args.limit, backend=args.backend)
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(dict(config=run_config, results=results), f, indent=2)
+        print('baseline saved to {}'.format(args.baseline))
+        return
+    if not os.path.exists(args.baseline):
+        print('no baseline found at {} (run with --save_baseline)'.format(args.baseline))
+        return
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    if baseline['config'] != run_config:
+        print('warning: baseline was recorded with {}'.format(baseline['config']))
+    regressions = compare(results, baseline['results'], args.threshold)
+    for key, metric, base, new in regressions:
+        print('REGRESSION {:<18} {:<22} {:>14.4g} -> {:<14.4g} ({})'.format(
+            key, metric, base, new, '+{:.1%}'.format(new / base - 1) if base else 'was 0'))
+    print('{} regressions beyond {:.0%} (baseline: {})'.format(len(regressions), args.threshold, args.baseline))
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,30 @@
+"""
+Simulation helpers shared by the benchmarks: simulators of configuration files or seeded random graphs, run with
+their output suppressed.
+"""
+import random
+import contextlib
+import io
+from configurator import Configurator
+from hurricane_simulator import Simulator
+
+
+def create_simulator(graph_path='random', n_vertices=None, seed=0):
+    """:return: a simulator of a configuration file, or of a random graph generated with the given seed"""
+    Configurator.graph_path = graph_path
+    Configurator.n_vertices = n_vertices
+    random.seed(seed)
+    with contextlib.redirect_stdout(io.StringIO()):
+        return Simulator(save_random_config=False)
+
+
+def run_simulation(sim: Simulator, agent_types):
+    """runs the simulation of the given agent types on sim, returns sim"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        sim.run_simulation(agent_types)
+    return sim
+
+
+def simulate(agent_types, graph_path='random', n_vertices=None, seed=0):
+    """runs a simulation of the given agent types (see create_simulator), returns the simulator"""
+    return run_simulation(create_simulator(graph_path, n_vertices, seed), agent_types)
@@ -1,14 +1,19 @@
 import argparse
-from random import sample
+from random import sample, randint, randrange, random
 from datetime import datetime
-from utils.data_structures import Edge
-from environment import Environment, ShelterNode, EvacuateNode, SmartGraph
+from utils.data_structures import Edge, Graph
+from utils.logger import Logger, LogLevel, debug
+from utils.profiler import Profiler
+from environment import Environment, ShelterNode, EvacuateNode, GRAPH_BACKENDS
 
 
 class Configurator:
     """static configurator class"""
+    debug = True  # human agents choose their moves randomly instead of reading user input
+
     @staticmethod
-    def get_user_config():
+    def get_user_config(argv=None):
+        """:param argv: command line arguments to parse (default: sys.argv)"""
         parser = argparse.ArgumentParser(description='''
         Environment simulator for the Hurricane Evacuation Problem
         example: python3 test.py -V 1 -K 5 -g tests/23-11__18-08-25.config -a AStar Vandal''')
@@ -18,18 +23,42 @@ class Configurator:
         parser.add_argument('-L', '--limit',         default='5',       type=int,            help='Real-time A* agent expansions limit')
         parser.add_argument('-T',                    default='0',       type=float,          help='search tree expansions time unit')
         parser.add_argument('-a', '--agents',        default=['AStar'], nargs='+',           help='active agent types')
+        parser.add_argument('-b', '--backend',       default='dict',    choices=GRAPH_BACKENDS, help='graph storage backend')
+        parser.add_argument('-n', '--n_vertices',    default=None,      type=int,            help='number of vertices in random graphs (default: 4-7, densely connected)')
+        parser.add_argument('--avg_degree',          default=3,         type=int,            help='average vertex degree in random graphs with n_vertices set')
+        parser.add_argument('--time_budget',         default=None,      type=float,          help='anytime search: wall-clock planning budget per strategy, in ms')
+        parser.add_argument('--h_table_dir',         default=None,                           help='directory to save and load LRTAStar learned heuristic tables (per config file, K, V and T)')
+        parser.add_argument('-W', '--beam_width',    default=10,        type=int,            help='number of plans kept at each search tree level by BeamSearch agents')
+        parser.add_argument('--memory_limit',        default=1000,      type=int,            help='maximal number of fringe plans kept by SMAStar agents')
+        parser.add_argument('--workers',             default=0,         type=int,            help='worker processes evaluating the heuristic of expanded nodes\' children (0: serially)')
+        parser.add_argument('--graph_search',        default=False,     action='store_true', help='search agents skip states that were already reached')
         # debug command line arguments
-        parser.add_argument('-d', '--debug',         default=True,      action='store_true', help='run in debug mode')
+        parser.add_argument('-d', '--debug',         dest='log_level',  action='store_const', const='DEBUG', default='DEBUG', help='same as --log_level DEBUG')
         parser.add_argument('-i', '--interactive',   default=True,      action='store_true', help='run interactively (with graph displays)')
         parser.add_argument('-s', '--view_strategy', default=True,      action='store_true', help='plot search agents strategy trees')
+        parser.add_argument('--log_level',           default='DEBUG',   choices=LogLevel.__members__, help='minimal level of printed messages')
+        parser.add_argument('--trace',               default=None,                           help='path of a JSONL file to write search trace events to')
+        parser.add_argument('--profile',             default=None,                           help='path of a JSON file to write search phase timings to (enables profiling)')
 
-        args = vars(parser.parse_args())
+        args = vars(parser.parse_args(argv))
         for k, v in args.items():
             setattr(Configurator, k, v)
+        Logger.configure(LogLevel[Configurator.log_level], Configurator.trace)
+        Profiler.configure(Configurator.profile)
         print("Environment Configured.")
 
     @staticmethod
-    def randomize_config():
+    def graph_type():
+        return GRAPH_BACKENDS[Configurator.backend]
+
+    @staticmethod
+    def randomize_config(save=True, n_vertices=None, avg_degree=3):
+        """
+        :param save: save the new configuration in a file under tests/
+        :param n_vertices: number of vertices. If None, a dense graph with 4-7 vertices is drawn until it is legal.
+                           Otherwise, a sparse graph (see random_sparse_graph) is generated in a single pass.
+        :param avg_degree: average vertex degree of sparse graphs
+        """
         def legal_config(G):
             inf = float('inf')
             V = G.get_vertices()
@@ -41,9 +70,9 @@ class Configurator:
                 return False
             s = list([v for v in V if v.is_shelter()])[0]
             # all nodes must be initially connected
-            G.dijkstra(s)
-            all_reachable = all([v.d < inf for v in V])
-            n_doomed_initial = sum([v.n_people for v in V if 2*v.d > v.deadline or 2*v.d > s.deadline])
+            d = G.shortest_paths(s).dist
+            all_reachable = all([d[v.id] < inf for v in V])
+            n_doomed_initial = sum([v.n_people for v in V if 2*d[v.id] > v.deadline or 2*d[v.id] > s.deadline])
             return has_shelter and all_reachable and n_doomed_initial == 0
 
         def rand_bool(prob=2):
@@ -52,7 +81,12 @@ class Configurator:
         def rand_weight(u, v):
             return sample(range(1, min(u.deadline, v.deadline)+1), 1)[0]
 
-        G = SmartGraph()
+        graph_type = Configurator.graph_type()
+        G = graph_type()
+        if n_vertices is not None:
+            V, E = Configurator.random_sparse_graph(n_vertices, avg_degree)
+            N = n_vertices
+            G = graph_type(V, E, Environment(G))
         while not legal_config(G):
             V = []
             E = []
@@ -68,9 +102,11 @@ class Configurator:
                 for v in V[:-1]:
                     if rand_bool(3):
                         E.append(Edge(u, v, rand_weight(u, v), 'E0'))
-            G = SmartGraph(V, E, Environment(G))
+            G = graph_type(V, E, Environment(G))
         Configurator.v_no_ops, Configurator.base_penalty = sample(range(5), 2)
         print('base penalty: {}; # vandal no ops: {}'.format(Configurator.base_penalty, Configurator.v_no_ops))
+        if not save:
+            return G
         filename = 'tests/{:%d-%m__%H-%M-%S}.config'.format(datetime.now())
         lines = []
         # save new configuration in file for review
@@ -87,8 +123,31 @@ class Configurator:
 
         return G
 
-
-def debug(s):
-    if Configurator.debug:
-        print(s)
-
+    @staticmethod
+    def random_sparse_graph(n_vertices, avg_degree=3, max_weight=5):
+        """
+        generates a legal configuration that scales to large graphs: a random spanning tree plus random edges up to the
+        requested average degree. Deadlines are drawn after the edges, so that every vertex can initially be evacuated
+        to the first shelter (2*d(s,v) <= deadline) and no retries are needed.
+        :return: vertex list, edge list
+        """
+        L = ['V{}'.format(i) for i in range(n_vertices)]
+        is_shelter = [i == 0 or random() < 0.2 for i in range(n_vertices)]
+        V = [ShelterNode(label, 0) if shelter else EvacuateNode(label, 0, randint(0, 19))
+             for label, shelter in zip(L, is_shelter)]
+        E = {}
+        for i in range(1, n_vertices):
+            j = randrange(i)
+            E[j, i] = Edge(V[j], V[i], randint(1, max_weight), 'E{}'.format(len(E)))
+        n_edges = min(n_vertices * avg_degree // 2, n_vertices * (n_vertices - 1) // 2)
+        while len(E) < n_edges:
+            i, j = sorted(sample(range(n_vertices), 2))
+            if (i, j) not in E:
+                E[i, j] = Edge(V[i], V[j], randint(1, max_weight), 'E{}'.format(len(E)))
+        E = list(E.values())
+        d = [int(d) for d in Graph(V, E).shortest_paths(V[0]).dist]  # the graph is connected
+        max_d = max(d)
+        for v in V:
+            v.deadline = 2 * d[v.id] + randint(0, 2 * max_weight)
+        V[0].deadline = 2 * max_d + randint(0, 2 * max_weight)
+        return V, E
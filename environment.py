@@ -1,13 +1,20 @@
-from utils.data_structures import Node, Edge, Graph
-from typing import List, Set, TypeVar
+from utils.data_structures import Node, Edge, Graph, CSRGraph
+from utils.shortest_paths import ShortestPaths
+from utils.profiler import profiled
+from collections import OrderedDict
+from typing import List, Set, Tuple, TypeVar
 from copy import copy as shallow_copy
 from action import Action
 from itertools import count
+import heapq
+import numpy as np
 AgentType = TypeVar('Agent')
 
 
 class EvacuateNode(Node):
     """Represents a node with people that are waiting for evacuation"""
+    __slots__ = ('deadline', 'n_people', 'n_people_initial', 'evacuated', 'agents')
+
     def __init__(self, label, deadline: int, n_people=0):
         super().__init__(label)
         self.deadline = deadline
@@ -29,6 +36,8 @@ class EvacuateNode(Node):
 
 class ShelterNode(EvacuateNode):
     """Represents a node with a shelter"""
+    __slots__ = ()
+
     def is_shelter(self):
         return True
 
@@ -41,35 +50,251 @@ class ShelterNode(EvacuateNode):
 
 class SmartGraph(Graph):
     """A variation of a graph that accounts for edge and node deadlines when running dijkstra"""
+    MAX_LATEST_DEPARTURES = 16  # number of latest departure results kept (one per blocked edges configuration)
+    MAX_ARRIVALS = 256  # number of time dependent shortest paths results kept (see earliest_arrival)
 
     def __init__(self, V: List[Node]=[], E: List[Edge]=[], env=None):
         """:param env: the enclosing environment in which the graph "lives". Used to access the environment's time."""
+        self.arrivals: OrderedDict[Tuple[int, int, float], ShortestPaths] = OrderedDict()
+        self.slacks: OrderedDict[Tuple[int, int], np.ndarray] = OrderedDict()
+        self.deadlines_by_id: np.ndarray = None
+        self.latest_departures: OrderedDict[int, np.ndarray] = OrderedDict()
         super().__init__(V, E)
         self.env = env
 
-    def is_blocked(self, u, v):
-        e = self.get_edge(u, v)
-        return e.blocked or self.env.time + e.w > e.deadline
+    def structure_changed(self):
+        super().structure_changed()
+        self.deadlines_by_id = None
+        self.deadlines_changed()
+
+    def deadlines_changed(self):
+        """drops the time dependent results, which depend on the edge deadlines"""
+        self.arrivals.clear()
+        self.slacks.clear()
+        self.latest_departures.clear()
+
+    def block_edge(self, v1, v2, block_time):
+        deadline = self.get_edge(v1, v2).deadline
+        super().block_edge(v1, v2, block_time)
+        if block_time != deadline:  # usually the deadline was already predicted (see Environment.get_edge_deadlines)
+            self.deadlines_changed()
+
+    def edge_blocked(self, e: Edge, time=None):
+        """:param time: the time the edge is entered at (default: the environment's time)"""
+        return e.blocked or (self.env.time if time is None else time) + e.w > e.deadline
+
+    def blocked_key(self, time=None):
+        """
+        returns a bitmask of the currently blocked edges (by edge id): blocked edges and edges past their deadline
+        :param time: time to check the deadlines at, instead of the environment's time
+        """
+        key = self.blocked_mask
+        time = self.env.time if time is None else time
+        for e in self.deadline_edges:
+            if time + e.w > e.deadline:
+                key |= 1 << e.id
+        return key
+
+    def vertex_deadlines(self) -> np.ndarray:
+        """returns an array of the vertex deadlines (by id)"""
+        if self.deadlines_by_id is None:
+            self.deadlines_by_id = np.array([v.deadline for v in self.vertex_list], dtype=float)
+        return self.deadlines_by_id
+
+    def untimed_paths(self, src) -> Tuple[ShortestPaths, np.ndarray]:
+        """
+        returns (paths, slack): the shortest paths from src with only the blocked edges skipped (see shortest_paths,
+        which repairs them as more edges get blocked), and for each vertex (by id) the latest time src can be left at
+        for its path to meet every edge and vertex deadline along it. Deadlines only ever lengthen the travel times,
+        so leaving src by slack[v], the time dependent travel time to v is paths.dist[v].
+        slacks are cached by (source, blocked edges)
+        """
+        paths = self.shortest_paths(src, -float('inf'))
+        key = src.id, paths.blocked_key
+        slack = self.slacks.get(key)
+        if slack is not None:
+            self.slacks.move_to_end(key)
+            return paths, slack
+        V, dist, prev = self.vertex_list, paths.dist.tolist(), paths.prev.tolist()
+        children = [[] for _ in V]
+        for i, p in enumerate(prev):
+            if p >= 0:
+                children[p].append(i)
+        slack = [float('inf')] * len(V)
+        order = [src.id]
+        for p in order:  # parents are settled before their children
+            for i in children[p]:
+                deadline = min(V[i].deadline, self.get_edge(V[p], V[i]).deadline)
+                slack[i] = min(slack[p], deadline - dist[i])
+                order.append(i)
+        slack = np.array(slack)
+        slack.flags.writeable = False
+        self.slacks[key] = slack
+        if len(self.slacks) > self.MAX_SHORTEST_PATHS:
+            self.slacks.popitem(last=False)
+        return paths, slack
+
+    @profiled('earliest_arrival')
+    def earliest_arrival(self, src, time=None) -> ShortestPaths:
+        """
+        time dependent shortest paths from src, leaving it at the given time (default: the environment's time).
+        Each edge is checked against its deadline at the time it is entered along the path (rather than at the current
+        time), and every vertex must be reached by its deadline. Since agents cannot wait, arriving earlier is never
+        worse, so a dijkstra over arrival times is exact.
+        The untimed shortest paths are exact for the vertices reached within their slack (see untimed_paths), and a
+        vertex whose untimed path misses its own deadline cannot be reached in time at all, so only the rest of the
+        vertices are settled by a dijkstra (see repair_arrivals).
+        :return: ShortestPaths whose dist are the travel times from src (inf if a vertex cannot be reached in time).
+                 results are cached by (source, blocked edges, departure time)
+        """
+        time = self.env.time if time is None else time
+        key = src.id, self.blocked_mask, time
+        result = self.arrivals.get(key)
+        if result is not None:
+            self.arrivals.move_to_end(key)
+            return result
+        paths, slack = self.untimed_paths(src)
+        on_time = time <= slack
+        if on_time.all():
+            result = paths
+        else:
+            result = self.repair_arrivals(src, time, paths, on_time)
+        self.arrivals[key] = result
+        if len(self.arrivals) > self.MAX_ARRIVALS:
+            self.arrivals.popitem(last=False)
+        return result
+
+    def repair_arrivals(self, src, time, paths: ShortestPaths, on_time: np.ndarray) -> ShortestPaths:
+        """
+        derives the time dependent shortest paths from the untimed paths: on_time vertices keep their untimed path,
+        vertices whose untimed path misses their own deadline are unreachable, and a dijkstra restricted to the rest,
+        seeded with their on_time neighbours, settles them (see earliest_arrival)
+        """
+        self.n_dijkstra_calls += 1
+        V = self.vertex_list
+        arrival = np.where(on_time, time + paths.dist, np.inf).tolist()
+        prev = np.where(on_time, paths.prev, -1).tolist()
+        invalid = set(np.flatnonzero(~on_time & (time + paths.dist <= self.vertex_deadlines())).tolist())
+        Q = []
+        for i in invalid:
+            for v, w in self.weighted_neighbours(V[i], -float('inf')):
+                t = arrival[v.id]
+                if v.id not in invalid and t + w < arrival[i] and t + w <= V[i].deadline \
+                        and not self.is_blocked(v, V[i], t):
+                    arrival[i], prev[i] = t + w, v.id
+            if prev[i] >= 0:
+                Q.append((arrival[i], i))
+        heapq.heapify(Q)
+        while Q:
+            t, i = heapq.heappop(Q)
+            if t > arrival[i]:
+                continue
+            for v, w in self.weighted_neighbours(V[i], t):  # edge deadlines are checked when leaving i
+                val = t + w
+                if v.id in invalid and val < arrival[v.id] and val <= v.deadline:
+                    arrival[v.id] = val
+                    prev[v.id] = i
+                    heapq.heappush(Q, (val, v.id))
+        return ShortestPaths.create(src.id, self.blocked_mask, [t - time for t in arrival], prev)
+
+    @profiled('latest_departure')
+    def latest_departure(self):
+        """
+        returns an array of the latest time an agent can leave each vertex (by id) and still reach some shelter by its
+        deadline, honoring the edge and vertex deadlines along the way (-inf if no shelter can be reached).
+        Leaving u to v at time t requires t + w(u,v) <= min(deadline(u,v), deadline(v), latest departure(v)), so the
+        values are settled backwards from the shelters by a dijkstra that extracts the latest departure first.
+        Does not depend on the current time, results are cached by blocked edges.
+        """
+        key = self.blocked_mask
+        latest = self.latest_departures.get(key)
+        if latest is not None:
+            self.latest_departures.move_to_end(key)
+            return latest
+        self.n_dijkstra_calls += 1
+        V = self.vertex_list
+        latest = [-float('inf')] * len(V)
+        Q = []
+        for v in V:
+            if v.is_shelter():
+                latest[v.id] = v.deadline
+                Q.append((-v.deadline, v.id))
+        heapq.heapify(Q)
+        while Q:
+            t, i = heapq.heappop(Q)
+            t = -t
+            if t < latest[i]:
+                continue
+            v = V[i]
+            for u, w in self.weighted_neighbours(v, -float('inf')):  # only blocked edges, deadlines are checked below
+                val = min(t, self.get_edge(u, v).deadline, v.deadline) - w
+                if val > latest[u.id]:
+                    latest[u.id] = val
+                    heapq.heappush(Q, (-val, u.id))
+        latest = np.array(latest)
+        self.latest_departures[key] = latest
+        if len(self.latest_departures) > self.MAX_LATEST_DEPARTURES:
+            self.latest_departures.popitem(last=False)
+        return latest
+
+
+class SmartCSRGraph(SmartGraph, CSRGraph):
+    """A SmartGraph stored in CSR arrays (see CSRGraph)"""
+
+    def edge_id_blocked(self, eid, time=None):
+        return self.blocked[eid] or (self.env.time if time is None else time) + self.weights[eid] > self.deadlines[eid]
+
+
+GRAPH_BACKENDS = {'dict': SmartGraph, 'csr': SmartCSRGraph}
 
 
 class State:
+    """
+    An immutable search state. Node evacuation status and edge blocking are encoded as bitmasks over vertex/edge ids:
+    require_evac_mask - nodes that still require evacuation
+    blocked_mask      - blocked edges (including edges blocked by their deadline at the agent's time)
+    """
+    __slots__ = ('agent', 'agent_state', 'require_evac_mask', 'blocked_mask', 'hash_key')
+
     def __init__(self,
                  agent: AgentType,
-                 agent_state: AgentType,
-                 require_evac_nodes: Set[EvacuateNode],
-                 blocked_edges: Set[Edge]):
-        """creates a new state. Inherits env and agent data, unless overwritten"""
+                 agent_state,
+                 require_evac_mask: int,
+                 blocked_mask: int):
+        """
+        creates a new state. Inherits env and agent data, unless overwritten
+        :param agent_state: the agent's AgentSnapshot (see Agent.get_agent_state)
+        """
         self.agent = agent
         self.agent_state = agent_state
-        self.require_evac_nodes = require_evac_nodes
-        self.blocked_edges = blocked_edges
+        self.require_evac_mask = require_evac_mask
+        self.blocked_mask = blocked_mask
+        self.hash_key = (agent_state, require_evac_mask, blocked_mask)
 
     def is_goal(self):
         return self.agent_state.terminated
 
-    def describe(self):
-        print("State: [{:<30}Evac:{}|Blocked:{}]"
-              .format(self.agent.summary(), self.require_evac_nodes, self.blocked_edges))
+    def compact(self):
+        """the fields the heuristic depends on, as a picklable tuple of numbers (see search_tree.doomed_people)"""
+        s = self.agent_state
+        return s.loc, s.time, s.n_carrying, self.require_evac_mask, self.blocked_mask
+
+    def key(self):
+        """a hashable identifier of the state, used to detect identical states reached through different paths"""
+        return self.hash_key
+
+    def __hash__(self):
+        return hash(self.hash_key)
+
+    def __eq__(self, other):
+        return self.hash_key == other.hash_key
+
+    def summary(self, G: Graph):
+        return "State: [{:<30}Evac:{}|Blocked:{}]"\
+            .format(self.agent.summary(), G.vertices_of(self.require_evac_mask), G.edges_of(self.blocked_mask))
+
+    def describe(self, G: Graph):
+        print(self.summary(G))
 
 
 class Environment:
@@ -77,65 +302,89 @@ class Environment:
         self.time = 0
         self.G: SmartGraph = G
         self.agents: List[AgentType] = []
-        self.require_evac_nodes: Set[EvacuateNode] = self.init_required_evac_nodes()
-        self.blocked_edges: Set[Edge] = set([])
-        self.agent_actions = {}
-
-    def tick(self):
-        self.time += 1
+        self.require_evac_mask = self.init_required_evac_mask()
+        self.agent_actions = []  # heap of (end_time, sequence number, action)
+        self.action_seq = count(0)
+
+    def next_event_time(self, agents=None):
+        """
+        returns the time of the next event: the earliest completion of a queued action or the earliest time a busy
+        agent becomes available. If an agent is still available at the current time, the clock moves one time unit.
+        :param agents: agents whose availability is considered (default: all agents)
+        """
+        times = [agent.time for agent in (self.agents if agents is None else agents) if not agent.terminated]
+        if self.agent_actions:
+            times.append(self.agent_actions[0][0])
+        future_times = [t for t in times if t > self.time]
+        if not future_times or len(future_times) < len(times):
+            return self.time + 1
+        return min(future_times)
+
+    def advance(self, agents=None):
+        """advances the clock straight to the next event and executes the actions that end by then"""
+        self.time = self.next_event_time(agents)
         self.execute_agent_actions()
 
     def all_terminated(self):
         return all([agent.terminated for agent in self.agents])
 
-    def init_required_evac_nodes(self):
-        return set([v for v in self.G.get_vertices() if (not v.is_shelter() and v.n_people > 0)])
+    def init_required_evac_mask(self):
+        mask = 0
+        for v in self.G.get_vertices():
+            if not v.is_shelter() and v.n_people > 0:
+                mask |= 1 << v.id
+        return mask
+
+    @property
+    def require_evac_nodes(self) -> List[EvacuateNode]:
+        return self.G.vertices_of(self.require_evac_mask)
+
+    def mark_evacuated(self, v: EvacuateNode):
+        self.require_evac_mask &= ~(1 << v.id)
 
     def get_blocked_edges(self):
-        return set([e for e in self.G.get_edges() if self.G.is_blocked(e.v1, e.v2)]) # shallow_copy(self.blocked_edges)
+        return set(self.G.edges_of(self.G.blocked_key()))
 
     def get_require_evac_nodes(self):
-        return shallow_copy(self.require_evac_nodes)
+        return set(self.require_evac_nodes)
 
     def get_agent_actions(self):
         return {agent: agent.actions_seq for agent in self.agents}
 
     def add_agent_actions(self, agent_actions_to_add):
         for action in agent_actions_to_add:
-            if action.end_time not in self.agent_actions:
-                self.agent_actions[action.end_time] = []
-            self.agent_actions[action.end_time].append(action)
+            heapq.heappush(self.agent_actions, (action.end_time, next(self.action_seq), action))
 
     def execute_agent_actions(self):
-        queued_actions = self.agent_actions.get(self.time)
-        if queued_actions:
-            for action in queued_actions:
-                print('[EXECUTING]' + action.description)
-                action.execute()
-            del self.agent_actions[self.time]
+        """executes all queued actions that end by the current time, in order of end time and registration"""
+        while self.agent_actions and self.agent_actions[0][0] <= self.time:
+            end_time, seq, action = heapq.heappop(self.agent_actions)
+            print('[EXECUTING]' + action.description)
+            action.execute(self)
 
+    @profiled('get_state')
     def get_state(self, agent: AgentType):
         return State(
             agent,
             agent.get_agent_state(),
-            self.get_require_evac_nodes(),
-            self.get_blocked_edges()
+            self.require_evac_mask,
+            self.G.blocked_key()
         )
 
+    @profiled('apply_state')
     def apply_state(self, state: State):
         """applies a state to the environment, in terms of the agent's state variables,
-           node evacuation status and blocked edges"""
-        agent, to_copy = state.agent, state.agent_state
-        agent.update(to_copy)
+           node evacuation status and blocked edges.
+           only nodes and edges that differ between the current state and the applied state are updated"""
+        agent = state.agent
+        agent.update(state.agent_state, self.G)
         self.time = agent.time
-        self.require_evac_nodes = shallow_copy(state.require_evac_nodes)
-        self.blocked_edges = shallow_copy(state.blocked_edges)
-        for v in self.G.get_vertices():
-            v_requires_evac = v in self.require_evac_nodes
+        for v in self.G.vertices_of(self.require_evac_mask ^ state.require_evac_mask):
+            v_requires_evac = bool(state.require_evac_mask >> v.id & 1)
             v.evacuated = not v_requires_evac
             v.n_people = v.n_people_initial if v_requires_evac else v.n_people
-        for e in self.G.get_edges():
-            e.blocked = e in self.blocked_edges
+        self.require_evac_mask = state.require_evac_mask
+        self.G.set_blocked_mask(state.blocked_mask)
 
     # Bonus
     def get_edge_deadlines(self):
@@ -143,6 +392,7 @@ class Environment:
         if not vandals:
             return
         vandal_states = [self.get_state(vandal) for vandal in vandals]
+        vandal_attrs = [dict(vandal.__dict__) for vandal in vandals]  # states only hold the fields the search changes
         V = self.G.get_vertices()
         agent_locs = {v: shallow_copy(v.agents) for v in V}
         self.G.display('Initial State: (Vandals simulation)')
@@ -150,11 +400,12 @@ class Environment:
             print('\nT={} (Vandals simulation)'.format(self.time))
             for vandal in vandals:
                 vandal.act(self)
-            self.tick()
+            self.advance(vandals)
         self.G.display('Final State: (Vandals simulation)')
         # restore initial state, keeping edge blocking times (edge deadlines)
-        for vandal_state in vandal_states:
+        for vandal, vandal_state, attrs in zip(vandals, vandal_states, vandal_attrs):
             self.apply_state(vandal_state)
+            vandal.__dict__.update(attrs)
         for v in V:
             v.agents = agent_locs[v]
         print("Finished vandals simulation. Edge deadlines:")
@@ -162,13 +413,14 @@ class Environment:
 
 
 class Plan:
-    ID = count(0)
+    __slots__ = ('ID', 'cost', 'state', 'action', 'parent', 'depth')
+    ids = count(0)
 
     def __init__(self, cost,
                  state: State,
                  action: Action,
                  parent=None):
-        self.ID = next(Plan.ID)
+        self.ID = next(Plan.ids)
         self.cost = cost
         self.state = state
         self.action = action
@@ -180,10 +432,11 @@ class Plan:
            to increase likelihood of larger number of people being saved"""
         return (self.cost, other.depth) < (other.cost, self.depth)
 
-    def summary(self):
-        return "[{1.loc}]\nF={0}\nS{1.n_saved}|C{1.n_carrying}|{2}{3}\nB:{4}"\
+    def summary(self, G: Graph):
+        return "[{1}]\nF={0}\nS{2.n_saved}|C{2.n_carrying}|{3}{4}\nB:{5}"\
             .format(self.cost,
+                    G.vertex_list[self.state.agent_state.loc],
                     self.state.agent_state,
-                    self.state.require_evac_nodes or [],
+                    G.vertices_of(self.state.require_evac_mask),
                     '|T' if self.state.agent_state.terminated else '',
-                    self.state.blocked_edges or [])
+                    G.edges_of(self.state.blocked_mask))
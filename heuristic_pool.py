@@ -0,0 +1,86 @@
+import atexit
+from concurrent.futures import ProcessPoolExecutor
+from environment import Environment, EvacuateNode, ShelterNode
+from utils.data_structures import Edge
+from search_tree import doomed_people
+
+worker_graph = None  # the graph copy of a worker process
+
+
+def graph_spec(G):
+    """a picklable description of the graph: its class, vertices and edges (by id), with their deadlines"""
+    if any(e is None for e in G.edge_list):
+        raise Exception('the heuristic pool does not support graphs with removed edges')
+    V = [(v.label, v.deadline, v.n_people_initial, v.is_shelter()) for v in G.vertex_list]
+    E = [(e.v1.id, e.v2.id, e.w, e.name, e.deadline) for e in G.edge_list]
+    return type(G), V, E
+
+
+def build_graph(spec):
+    """rebuilds a graph from its spec, in an environment of its own. vertex and edge ids are kept"""
+    graph_type, V, E = spec
+    V = [ShelterNode(label, deadline) if shelter else EvacuateNode(label, deadline, n_people)
+         for label, deadline, n_people, shelter in V]
+    edges = []
+    for i, j, w, name, deadline in E:
+        e = Edge(V[i], V[j], w, name)
+        e.deadline = deadline
+        edges.append(e)
+    G = graph_type(V, edges)
+    G.env = Environment(G)
+    G.interactive = False
+    return G
+
+
+def init_worker(spec):
+    global worker_graph
+    worker_graph = build_graph(spec)
+
+
+def evaluate(states):
+    return doomed_people(worker_graph, states)
+
+
+class HeuristicPool:
+    """
+    Evaluates the heuristic of batches of states in worker processes. Each worker rebuilds the graph once from its
+    spec and keeps it (with its shortest paths caches), states are sent as State.compact() tuples.
+    A batch is split into contiguous chunks, one per worker, and the values are merged back in order, so the results
+    are identical to a serial evaluation.
+    """
+    pools = {}  # n_workers -> the pool shared by all search trees
+
+    def __init__(self, G, n_workers):
+        self.n_workers = n_workers
+        self.spec = graph_spec(G)
+        self.executor = ProcessPoolExecutor(n_workers, initializer=init_worker, initargs=(self.spec,))
+
+    @staticmethod
+    def get(G, n_workers):
+        """returns a pool of n_workers processes for G. The workers are restarted if the graph's deadlines changed"""
+        pool = HeuristicPool.pools.get(n_workers)
+        if pool is None or pool.spec != graph_spec(G):
+            if pool is not None:
+                pool.shutdown()
+            pool = HeuristicPool.pools[n_workers] = HeuristicPool(G, n_workers)
+        return pool
+
+    def doomed_people(self, states):
+        """same as search_tree.doomed_people(G, states)"""
+        if not states:
+            return []
+        size = -(-len(states) // self.n_workers)
+        chunks = [states[i:i + size] for i in range(0, len(states), size)]
+        return [h for values in self.executor.map(evaluate, chunks) for h in values]
+
+    def shutdown(self):
+        self.executor.shutdown()
+
+    @staticmethod
+    def shutdown_all():
+        for pool in HeuristicPool.pools.values():
+            pool.shutdown()
+        HeuristicPool.pools.clear()
+
+
+atexit.register(HeuristicPool.shutdown_all)
@@ -9,14 +9,16 @@ from environment import Environment, ShelterNode, EvacuateNode, SmartGraph
 class Simulator:
     """Hurricane evacuation simulator"""
 
-    def __init__(self):
-        self.G: SmartGraph = self.get_graph()
+    def __init__(self, save_random_config=True):
+        """:param save_random_config: save randomly generated configurations in a file"""
+        self.G: SmartGraph = self.get_graph(save_random_config)
         self.env: Environment = Environment(self.G)
         self.G.env = self.env
+        self.G.interactive = Configurator.interactive
 
-    def get_graph(self):
-        if Configurator.graph_path is 'random':
-            return Configurator.randomize_config()
+    def get_graph(self, save_random_config=True):
+        if Configurator.graph_path == 'random':
+            return Configurator.randomize_config(save_random_config, Configurator.n_vertices, Configurator.avg_degree)
         else:
             return self.parse_graph(Configurator.graph_path)
 
@@ -68,7 +70,7 @@ class Simulator:
         print(n_vertices)
         if n_vertices != len(V):
             raise Exception("Error: |V| != N")
-        return SmartGraph(V, E)
+        return Configurator.graph_type()(V, E)
 
     def init_agents(self, agents):
         shelters = [v for v in self.G.get_vertices() if v.is_shelter()]
@@ -91,5 +93,5 @@ class Simulator:
             for agent in self.env.agents:
                 self.env.G.display('T={}: {}'.format(tick, agent.name))
                 agent.act(self.env)
-            self.env.tick()
+            self.env.advance()
         self.env.G.display('Final State: T=' + str(self.env.time))
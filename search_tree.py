@@ -1,18 +1,82 @@
-from utils.data_structures import Heap, Stack
+from time import perf_counter
+import heapq
+import numpy as np
+from utils.data_structures import BucketQueue, Stack
 from typing import Union
 from utils.tree import display_tree
-from environment import Environment, Plan, State, EvacuateNode
+from environment import Environment, Plan, State, EvacuateNode, SmartGraph
 from configurator import Configurator, debug
+from utils.logger import Logger, LogLevel, info, trace
+from utils.profiler import profiled
 from action import Action, ActionType
 
 
+def doomed_people(G: SmartGraph, states):
+    """
+    the heuristic of a batch of states, given as State.compact() tuples, evaluated with NumPy: states are grouped by
+    their blocked edges, and the pickup times of all the states and candidates of a group are compared to its latest
+    departure times at once. Sets the graph's blocked edges.
+    :return: list of the number of people that cannot be saved in each state
+    """
+    h = [None] * len(states)
+    groups = {}
+    for i, (_, _, _, _, blocked_mask) in enumerate(states):
+        groups.setdefault(blocked_mask, []).append(i)
+    n = len(G.vertex_list)
+    n_people = np.array([v.n_people_initial for v in G.vertex_list])
+    for blocked_mask, group in groups.items():
+        G.set_blocked_mask(blocked_mask)
+        latest_departure = G.latest_departure()
+        src, time, carrying, require_evac_masks, _ = zip(*[states[i] for i in group])
+        # require_evac[c, v]: v requires evacuation in the c'th state
+        require_evac = np.array([np.unpackbits(np.frombuffer(mask.to_bytes(n // 8 + 1, 'little'), dtype=np.uint8),
+                                               bitorder='little')[:n]
+                                 for mask in require_evac_masks], dtype=bool)
+        candidates = np.flatnonzero(require_evac.any(axis=0))
+        # pickup[c, u]: arrival time at candidate u from the c'th state's location (inf if its deadline is missed).
+        # travel times depend on the departure time, so there is no single distance matrix to gather them from: the
+        # untimed distances are exact only within their slack (see SmartGraph.untimed_paths), which almost no state's
+        # candidates are, so the rows are looked up per (source, time) in the graph's earliest arrivals cache
+        travel = np.array([G.earliest_arrival(G.vertex_list[u], t).dist[candidates] for u, t in zip(src, time)])
+        time = np.array(time, dtype=float)
+        pickup = time[:, None] + travel.reshape(len(group), len(candidates))
+        # deliverable[c, u]: some shelter is reached before its deadline after picking up u
+        deliverable = pickup <= latest_departure[candidates]
+        doomed = require_evac[:, candidates] & ~deliverable
+        # no shelter can be reached with the people already carried
+        stranded = time > latest_departure[np.array(src)]
+        for i, n_doomed_people in zip(group, doomed @ n_people[candidates] + stranded * np.array(carrying)):
+            h[i] = int(n_doomed_people)
+    return h
+
+
 class SearchTree:
-    def __init__(self, env: Environment, agent):
+    keep_hist = True  # keep the expanded plans (for display, re-rooting and learning)
+    priority_queue = BucketQueue  # the fringe's type (costs are integers: the penalty plus a number of people)
+
+    def __init__(self, env: Environment, agent, graph_search=False, h_table=None, pool=None):
+        """
+        :param graph_search: if True, states that were already reached through another path are not expanded again
+        :param h_table: learned heuristic values by state key (see LRTAStar), used instead of computing the heuristic
+        :param pool: HeuristicPool to evaluate the heuristic of expanded nodes' children in (default: serially)
+        """
+        self.h_table = h_table
+        self.pool = pool
         self.agent = agent
         self.env = env
         self.root = self.get_root_node()
-        self.fringe: Heap[Plan] = Heap([self.root])
+        self.fringe: BucketQueue = self.priority_queue([self.root])
         self.hist = [] # used for debug
+        self.graph_search = graph_search
+        self.closed = set()  # keys of expanded states (graph search)
+        self.open = {self.root.state.key(): self.root} if graph_search else {}  # state key -> plan in fringe
+        # search statistics
+        self.n_heuristic_calls = 0
+        self.n_duplicates = 0
+        self.peak_fringe_size = 1
+        self.elapsed = 0.0  # wall-clock time of the last tree_search, in seconds
+        self.solution: Plan = None  # the plan the returned strategy was backtracked from
+        self.last_option: Plan = None  # the fringe node extracted (but not expanded) by the last tree_search
 
     def get_initial_state(self):
         return self.env.get_state(self.agent)
@@ -31,6 +95,7 @@ class SearchTree:
 
     def backtrack(self, goal):
         """backtrack through nodes from goal to root, pushing to the stack each step, returning the agent's strategy """
+        self.solution = goal
         strategy = Stack()
         curr_node: Plan = goal
         while curr_node.parent is not None:
@@ -40,8 +105,13 @@ class SearchTree:
         self.display()
         return strategy
 
-    def tree_search(self, max_expand=float('inf')):
-        """initialize state tree using the initial state of problem"""
+    def tree_search(self, max_expand=float('inf'), deadline=None):
+        """
+        initialize state tree using the initial state of problem
+        :param deadline: perf_counter() time at which the search stops (anytime mode): the best plan in the fringe so far
+                         is returned, as when max_expand is reached. The root is always expanded.
+        """
+        start = perf_counter()
         expand_count = 0
         while True:
             # if there are no candidates for expansion, return fail
@@ -49,80 +119,214 @@ class SearchTree:
                 raise Exception("Tree search failed!")
             # choose which node to expand based on strategy: use heuristic to determine the best option to expand
             option = self.fringe.extract_min()
-            self.hist.append(option) # for debug
+            if self.keep_hist:
+                self.hist.append(option) # for debug
+            if self.graph_search:
+                del self.open[option.state.key()]
             # if the node contains a goal state, return the solution
             if option.state.is_goal():
                 # check if the chosen node is a goal node
                 debug("goal reached:")
-                option.state.describe()
+                debug(option.state.summary, self.env.G)
+                trace('goal', id=option.ID, cost=option.cost, depth=option.depth, expand_count=expand_count)
+                self.elapsed = perf_counter() - start
+                self.last_option = option
                 return expand_count, self.backtrack(option)
-            elif expand_count < max_expand:
+            elif expand_count < max_expand and (deadline is None or expand_count == 0 or perf_counter() < deadline):
                 # otherwise, expand the node
+                if self.graph_search:
+                    self.closed.add(option.state.key())
                 self.expand_node(option)
                 expand_count += 1
+                self.peak_fringe_size = max(self.peak_fringe_size, len(self.fringe))
             else:
-                print('Maximum number of expansions reached. Returning best strategy so far')
+                self.elapsed = perf_counter() - start
+                info('{} reached after {} expansions ({:.1f}ms). Returning best strategy so far',
+                     'Maximum number of expansions' if expand_count >= max_expand else 'Time budget',
+                     expand_count, 1000 * self.elapsed)
+                self.last_option = option
                 return expand_count, self.backtrack(option)
 
+    def first_step(self):
+        """returns the child of the root in the path to the last solution (None if the solution is the root)"""
+        node = self.solution
+        while node is not None and node.parent is not self.root:
+            node = node.parent
+        return node
+
+    def reroot(self, child: Plan):
+        """
+        makes a child of the root the new root of the tree, after the child's action was executed (real-time search).
+        the fringe nodes in the child's subtree are kept with their costs, the rest of the tree is pruned.
+        """
+        def in_subtree(plan):
+            while plan.depth > child.depth:
+                plan = plan.parent
+            return plan is child
+
+        if self.last_option is not None:
+            # the last extracted option was not expanded, return it to the fringe
+            self.hist.pop()
+            self.fringe.insert(self.last_option)
+            self.last_option = None
+        self.fringe = self.priority_queue([plan for plan in self.fringe if in_subtree(plan)])
+        self.hist = [plan for plan in self.hist if in_subtree(plan)]
+        if self.graph_search:
+            self.open = {plan.state.key(): plan for plan in self.fringe}
+            self.closed = {plan.state.key() for plan in self.hist}
+        child.parent = None
+        self.root = child
+
+    @profiled('heuristic')
     def heuristic(self, state: State=None):
         """given a state for an agent, returns how many people cannot be saved by the agent"""
+        if self.h_table is not None:
+            h = self.h_table.get(state.key())
+            if h is not None:
+                return h
+        self.n_heuristic_calls += 1
         self.env.apply_state(state)
         agent = state.agent
         src = agent.loc
-        self.env.G.dijkstra(src)
-        V = self.env.G.get_vertices()
+        G = self.env.G
+        arrival = G.earliest_arrival(src)
+        latest_departure = G.latest_departure()
+        shelters = [v for v in G.get_vertices() if v.is_shelter()]
         require_evac_nodes = list(self.env.require_evac_nodes)
         # find nodes that can be reached before hurricane hits them. create (node, required_pickup_time) pairs
         evac_candidates, doomed_nodes = [], []
         for v in require_evac_nodes:
-            if self.env.time + v.d > v.deadline:
+            if self.env.time + arrival.distance(v) > v.deadline:
                 doomed_nodes.append(v) # nodes we cannot save from the imminent hurricane
             else:
-                evac_candidates.append((v, self.env.time + v.d, list(self.env.G.get_shortest_path(src, v))))
-        for u, time_after_pickup, pickup_shortest_path in evac_candidates:
-            self.env.G.dijkstra(u) # calculate minimum distance from node after pickup
-            shelter_candidates = [(v, time_after_pickup + v.d, list(self.env.G.get_shortest_path(u, v))) for v in V
-                                  if v.is_shelter() and time_after_pickup + v.d <= v.deadline]
-            if not shelter_candidates:
+                evac_candidates.append((v, self.env.time + arrival.distance(v)))
+        for u, time_after_pickup in evac_candidates:
+            # some shelter is reached before its deadline only if u is left before its latest departure time
+            if time_after_pickup > latest_departure[u.id]:
                 doomed_nodes.append(u)
-            debug('\npossible routes for evacuating {}:'.format(u))
-            for shelter, total_time, dropoff_shortest_path in shelter_candidates:
-                debug('pickup:(T{}){}(T{}) | drop-off:{}(T{}): Shelter(D{})'.format(self.env.time,
-                                                                                    pickup_shortest_path,
-                                                                                    time_after_pickup,
-                                                                                    dropoff_shortest_path,
-                                                                                    total_time,
-                                                                                    shelter.deadline))
+            if not Logger.enabled(LogLevel.DEBUG):
+                continue
+            drop_off = G.earliest_arrival(u, time_after_pickup)
+            shelter_candidates = [(v, time_after_pickup + drop_off.distance(v)) for v in shelters
+                                  if time_after_pickup + drop_off.distance(v) <= v.deadline]
+            debug('\npossible routes for evacuating {}:', u)
+            for shelter, total_time in shelter_candidates:
+                debug(lambda: 'pickup:(T{}){}(T{}) | drop-off:{}(T{}): Shelter(D{})'.format(
+                    self.env.time, [G.vertex_list[i] for i in arrival.path_ids(u)], time_after_pickup,
+                    [G.vertex_list[i] for i in drop_off.path_ids(shelter)], total_time, shelter.deadline))
         n_doomed_people = sum([v.n_people for v in doomed_nodes])
-        debug('h(x) = {} = # of doomed people (doomed_nodes = {})'.format(n_doomed_people, doomed_nodes))
+        if self.env.time > latest_departure[src.id]:
+            n_doomed_people += agent.n_carrying  # no shelter can be reached with the people already carried
+        debug('h(x) = {} = # of doomed people (doomed_nodes = {})', n_doomed_people, doomed_nodes)
         return n_doomed_people
 
+    @profiled('heuristics')
+    def heuristics(self, states):
+        """
+        evaluates the heuristic for a batch of states (the children of a node) at once (see doomed_people),
+        in the worker processes of the tree's pool if it has one.
+        :return: list of heuristic values (same as heuristic() for each state)
+        """
+        h = [None] * len(states)
+        if self.h_table is not None:
+            h = [self.h_table.get(state.key()) for state in states]
+        pending = [i for i in range(len(states)) if h[i] is None]
+        if Logger.enabled(LogLevel.DEBUG):
+            # the per state heuristic prints the evacuation routes
+            for i in pending:
+                h[i] = self.heuristic(states[i])
+            return h
+        self.n_heuristic_calls += len(pending)
+        compact_states = [states[i].compact() for i in pending]
+        if self.pool is not None:
+            values = self.pool.doomed_people(compact_states)
+        else:
+            values = doomed_people(self.env.G, compact_states)
+        for i, value in zip(pending, values):
+            h[i] = value
+        return h
+
+    def total_costs(self, states):
+        """total_cost of a batch of states, with the heuristic evaluated in one batch (see heuristics)"""
+        h = iter(self.heuristics([state for state in states if not state.is_goal()]))
+        return [state.agent_state.penalty + (0 if state.is_goal() else next(h)) for state in states]
+
+    @profiled('total_cost')
     def total_cost(self, state):
         # assumes environment's state was updated before calling this function
         h = 0 if state.is_goal() else self.heuristic(state)
         g = state.agent.penalty
-        debug('cost = g + h = {} + {} = {}'.format(g, h, g+h))
+        debug('cost = g + h = {} + {} = {}', g, h, g + h)
         return g + h
 
+    @profiled('expand_node')
     def expand_node(self, plan: Plan):
         """Expands fringe, adding (path, state) pair of all possible moves."""
         self.env.apply_state(plan.state)
         agent = plan.state.agent
-        debug("Expanding node ID={0.ID} (cost = {0.cost}):".format(plan))
-        plan.state.describe()
-        neighbours = agent.get_possible_steps(self.env, verbose=True) # options to proceed
+        debug("Expanding node ID={0.ID} (cost = {0.cost}):", plan)
+        debug(plan.state.summary, self.env.G)
+        trace('expand', id=plan.ID, cost=plan.cost, depth=plan.depth)
+        neighbours = agent.get_possible_steps(self.env, verbose=Logger.enabled(LogLevel.DEBUG)) # options to proceed
+        children = []
         for dest in neighbours + [ActionType.TERMINATE]:
             action, result_state = self.successor(plan.state, dest)
             debug("\ncreated state:")
-            result_state.describe()
-            cost = self.total_cost(result_state)
-            new_plan = Plan(cost=cost,
-                            state=result_state,
-                            action=action,
-                            parent=plan)
-            debug("plan ID={}".format(new_plan.ID))
-            self.fringe.insert(new_plan)
+            debug(result_state.summary, self.env.G)
+            children.append((action, result_state))
+        if self.graph_search:
+            # costs are only computed for states that were not reached before
+            new_states = [state for _, state in children
+                          if state.key() not in self.closed and state.key() not in self.open]
+            costs = dict(zip(map(State.key, new_states), self.total_costs(new_states)))
+            for action, result_state in children:
+                self.insert_unique(plan, action, result_state, costs.get(result_state.key()))
+            return
+        for (action, result_state), cost in zip(children, self.total_costs([state for _, state in children])):
+            self.add_child(plan, action, result_state, cost)
+
+    def add_child(self, parent: Plan, action: Action, state: State, cost):
+        """tree search fringe insertion of a child of an expanded plan"""
+        new_plan = Plan(cost=cost,
+                        state=state,
+                        action=action,
+                        parent=parent)
+        debug("plan ID={}", new_plan.ID)
+        trace('generate', id=new_plan.ID, parent=parent.ID, cost=cost, depth=new_plan.depth)
+        self.fringe.insert(new_plan)
+        return new_plan
+
+    def insert_unique(self, parent: Plan, action: Action, state: State, cost=None):
+        """
+        graph search fringe insertion: a state that was already expanded is dropped.
+        a state that is already in the fringe has the same cost (the cost is a function of the state),
+        so the heuristic is not evaluated again and the better of the two plans (see Plan.__lt__) is kept.
+        :param cost: the state's cost, if it was already computed
+        """
+        key = state.key()
+        if key in self.closed:
+            self.n_duplicates += 1
+            return
+        duplicate = self.open.get(key)
+        if duplicate is not None:
+            cost = duplicate.cost
+        elif cost is None:
+            cost = self.total_cost(state)
+        new_plan = Plan(cost=cost,
+                        state=state,
+                        action=action,
+                        parent=parent)
+        if duplicate is not None:
+            self.n_duplicates += 1
+            if not new_plan < duplicate:
+                return
+            self.fringe.remove(duplicate)
+        debug("plan ID={}", new_plan.ID)
+        trace('generate', id=new_plan.ID, parent=parent.ID, cost=cost, depth=new_plan.depth)
+        self.fringe.insert(new_plan)
+        self.open[key] = new_plan
 
+    @profiled('successor')
     def successor(self, state: State, dest: Union[EvacuateNode, ActionType]):
         """
         :param state: a state of the environment in the search tree node
@@ -132,31 +336,171 @@ class SearchTree:
         self.env.apply_state(state)
         agent = state.agent
         if dest == ActionType.TERMINATE:
-            def terminate_agent():
-                agent.terminate(self.env)
             action = Action(
                 agent=agent,
-                description='*[T={:>3}] "TERMINATE" action for {}'.format(agent.time, agent.name),
-                callback=terminate_agent)
+                action_type=ActionType.TERMINATE,
+                template='*[T={:>3}] "TERMINATE" action for {}',
+                args=(agent.time, agent.name))
             agent.local_terminate()
         else:
-            def move_agent():
-                agent.goto2(self.env, dest)
             action = Action(
                 agent=agent,
-                description='*[T={:>3}] "GOTO {}->{}" action for {}'.format(agent.time, agent.loc, dest, agent.name),
-                callback=move_agent)
+                action_type=ActionType.GOTO,
+                target=dest,
+                template='*[T={:>3}] "GOTO {}->{}" action for {}',
+                args=(agent.time, agent.loc, dest, agent.name))
             agent.local_goto(self.env, dest)
-        action.describe()
+        debug(action.template, *action.args)
         return action, self.env.get_state(agent)
 
+    def nodes(self):
+        """the plans in the tree, the root first"""
+        return self.hist + list(self.fringe)
+
     def display(self):
         """plots the search tree"""
         if not Configurator.view_strategy:
             return
-        state_nodes = self.hist + self.fringe.heap
-        for node in state_nodes:
-            node.tmp = node.summary() + ' {}'.format(node.ID)
-        V = [node.tmp for node in state_nodes]
-        E = [(node.tmp, node.parent.tmp) for node in state_nodes if node.parent is not None]
+        state_nodes = self.nodes()
+        if not state_nodes:
+            return
+        labels = {node: node.summary(self.env.G) + ' {}'.format(node.ID) for node in state_nodes}
+        V = [labels[node] for node in state_nodes]
+        E = [(labels[node], labels[node.parent]) for node in state_nodes if node.parent in labels]
         display_tree(V[0], V, E)
+
+
+class BeamSearchTree(SearchTree):
+    """
+    Beam search: the tree is searched level by level, and only the best width plans of each level are expanded,
+    so a search costs at most width expansions per level. The best goal found is returned once no plan left in the
+    beam is better than it (or the beam is empty).
+    """
+    def __init__(self, env: Environment, agent, width, h_table=None):
+        super().__init__(env, agent, graph_search=False, h_table=h_table)
+        self.width = max(width, 1)
+
+    def tree_search(self, max_expand=float('inf'), deadline=None):
+        """
+        :param max_expand: the search stops before the level that would exceed it (as with the deadline), returning
+                           the best goal found so far, or the best plan in the beam if no goal was found
+        """
+        start = perf_counter()
+        expand_count = 0
+        beam = [self.root]
+        best_goal = None
+        while True:
+            goals = [plan for plan in beam if plan.state.is_goal()]
+            if goals:
+                best_goal = min(goals if best_goal is None else goals + [best_goal])
+            beam = [plan for plan in beam if not plan.state.is_goal()]
+            if not beam or (best_goal is not None and not min(beam) < best_goal):
+                break
+            if expand_count + len(beam) > max_expand or \
+                    (deadline is not None and expand_count > 0 and perf_counter() >= deadline):
+                info('{} reached after {} expansions. Returning best strategy so far',
+                     'Maximum number of expansions' if expand_count + len(beam) > max_expand else 'Time budget',
+                     expand_count)
+                break
+            self.fringe = self.priority_queue([])
+            for plan in beam:
+                self.hist.append(plan)
+                self.expand_node(plan)
+                expand_count += 1
+            self.peak_fringe_size = max(self.peak_fringe_size, len(self.fringe))
+            # the next level: the best children of the expanded plans
+            beam = heapq.nsmallest(self.width, self.fringe)
+            self.fringe = self.priority_queue(beam)
+            trace('beam', expand_count=expand_count, size=len(beam))
+        self.elapsed = perf_counter() - start
+        self.last_option = None
+        solution = best_goal if best_goal is not None and (not beam or not min(beam) < best_goal) else min(beam)
+        debug("goal reached:" if solution.state.is_goal() else "best plan in beam:")
+        debug(solution.state.summary, self.env.G)
+        return expand_count, self.backtrack(solution)
+
+
+class SMAStarTree(SearchTree):
+    """
+    Simplified memory-bounded A* (SMA*): the fringe holds at most max_nodes plans. When it overflows, the worst leaf
+    (highest cost, shallowest) is dropped and its cost is backed up to its parent. Once all of a parent's children
+    were dropped, the parent returns to the fringe with the lowest cost it forgot, and its children are regenerated
+    if it is extracted again. Expanded plans are not kept in hist, so only the fringe plans and their ancestors are
+    in memory. The strategy is optimal if max_nodes allows keeping the optimal path's fringe. Tree search only:
+    a closed set would block regenerating dropped subtrees.
+    """
+    keep_hist = False
+
+    def __init__(self, env: Environment, agent, max_nodes, h_table=None):
+        super().__init__(env, agent, graph_search=False, h_table=h_table)
+        self.max_nodes = max(max_nodes, 1)
+        self.n_children = {}  # expanded plan -> number of its children that were not dropped
+        self.forgotten = {}  # expanded plan -> lowest cost of its dropped children
+        self.new_children = []  # children of the plan being expanded
+        self.n_dropped = 0
+        # max-heap of the fringe plans by (cost, shallowness), entries of plans that left the fringe are skipped
+        self.worst = []
+        self.push_worst(self.root)
+
+    def push_worst(self, plan: Plan):
+        heapq.heappush(self.worst, (-plan.cost, plan.depth, plan.ID, plan))
+
+    def pop_worst(self, keep: Plan):
+        """extracts the worst plan in the fringe other than keep"""
+        kept = None
+        while True:
+            cost, _, _, plan = heapq.heappop(self.worst)
+            if plan not in self.fringe or -cost != plan.cost:
+                continue  # outdated entry
+            if plan is keep:
+                kept = plan
+                continue
+            if kept is not None:
+                self.push_worst(kept)
+            return plan
+
+    def expand_node(self, plan: Plan):
+        self.n_children[plan] = 0
+        self.forgotten.pop(plan, None)
+        self.new_children = []
+        super().expand_node(plan)
+        # the best child of the expanded plan is kept, so that the search always makes progress
+        best_child = min(self.new_children)
+        while len(self.fringe) > self.max_nodes:
+            self.drop(self.pop_worst(keep=best_child))
+        if len(self.worst) > 2 * len(self.fringe):
+            # drop the outdated entries
+            self.worst = [(-p.cost, p.depth, p.ID, p) for p in self.fringe]
+            heapq.heapify(self.worst)
+
+    def add_child(self, parent: Plan, action: Action, state: State, cost):
+        # path-max: a regenerated child costs at least the cost backed up to its parent
+        child = super().add_child(parent, action, state, max(cost, parent.cost))
+        self.n_children[parent] += 1
+        self.new_children.append(child)
+        self.push_worst(child)
+        return child
+
+    def drop(self, leaf: Plan):
+        """removes a leaf from the fringe, backing up its cost to its parent"""
+        self.fringe.remove(leaf)
+        self.n_dropped += 1
+        parent = leaf.parent
+        trace('drop', id=leaf.ID, parent=parent.ID, cost=leaf.cost)
+        self.forgotten[parent] = min(self.forgotten.get(parent, float('inf')), leaf.cost)
+        self.n_children[parent] -= 1
+        if self.n_children[parent] == 0:
+            # all the children were dropped: the parent is a leaf again
+            del self.n_children[parent]
+            parent.cost = self.forgotten.pop(parent)
+            self.fringe.insert(parent)
+            self.push_worst(parent)
+
+    def nodes(self):
+        """the fringe plans and the solution, with their ancestors"""
+        nodes = {}
+        for plan in list(self.fringe) + [self.solution]:
+            while plan is not None and plan not in nodes:
+                nodes[plan] = None
+                plan = plan.parent
+        return sorted(nodes, key=lambda plan: plan.ID)
@@ -1,6 +1,6 @@
 from hurricane_simulator import Simulator
 from agents.base_agents import Human, Greedy, Vandal
-from agents.search_agents import GreedySearch, RTAStar, AStar
+from agents.search_agents import GreedySearch, RTAStar, AStar, LRTAStar, SMAStar, BeamSearch
 from configurator import Configurator
 
 if __name__ == '__main__':
@@ -23,7 +23,7 @@ if __name__ == '__main__':
     #     bonus_sim.run_simulation([search_agent_type, Vandal])
 
     # Additional tests
-    all_agents = [Human, Greedy, Vandal, GreedySearch, RTAStar, AStar]
+    all_agents = [Human, Greedy, Vandal, GreedySearch, RTAStar, AStar, LRTAStar, SMAStar, BeamSearch]
     active_agents = [agent_type for agent_type in all_agents if agent_type.__name__ in Configurator.agents]
     sim = Simulator()
     sim.run_simulation(active_agents)
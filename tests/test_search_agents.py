@@ -0,0 +1,128 @@
+"""
+Regression runs: every search agent on every tests/*.config, with T > 0 and strategy trees plotted (headless).
+run: python3 -m pytest tests
+"""
+import os
+import io
+import random
+import contextlib
+from glob import glob
+import pytest
+import matplotlib
+matplotlib.use('Agg')
+from configurator import Configurator
+from hurricane_simulator import Simulator
+from agents.search_agents import GreedySearch, RTAStar, AStar, LRTAStar, SMAStar, BeamSearch
+from heuristic_pool import HeuristicPool
+
+CONFIGS = sorted(glob(os.path.join(os.path.dirname(__file__), '*.config')))
+AGENT_TYPES = [GreedySearch, RTAStar, AStar, LRTAStar, SMAStar, BeamSearch]
+RANDOM_GRAPH_SIZE = 7
+# configuration files, and random graphs (by seed), on one of which a width-1 beam loses cost
+SEARCH_GRAPHS = [(graph_path, 0) for graph_path in CONFIGS] + [('random', seed) for seed in range(4)]
+
+
+@pytest.fixture(autouse=True)
+def configure():
+    with contextlib.redirect_stdout(io.StringIO()):
+        Configurator.get_user_config(['--log_level', 'SILENT', '--memory_limit', '20', '-W', '4'])
+    Configurator.interactive = False
+    Configurator.view_strategy = True
+    LRTAStar.h_tables.clear()
+
+
+def simulate(graph_path, agent_types, T, seed=0):
+    """runs a simulation of a configuration file (or of a random graph generated with seed), returns the simulator"""
+    Configurator.graph_path = graph_path
+    Configurator.T = T
+    random.seed(seed)
+    with contextlib.redirect_stdout(io.StringIO()):
+        sim = Simulator(save_random_config=False)
+        sim.run_simulation(agent_types)
+    return sim
+
+
+def run(graph_path, agent_type, T=0, seed=0):
+    """:return: the actions, score and number of expansions of a single agent simulation"""
+    agent = simulate(graph_path, [agent_type], T, seed).env.agents[0]
+    return [(action.action_type, str(action.target), action.end_time) for action in agent.actions_seq], \
+        agent.get_score(), agent.expand_count
+
+
+@pytest.mark.parametrize('T', [0.01, 0.5])
+@pytest.mark.parametrize('agent_type', AGENT_TYPES, ids=lambda agent_type: agent_type.__name__)
+@pytest.mark.parametrize('graph_path', CONFIGS, ids=os.path.basename)
+def test_simulation_terminates(graph_path, agent_type, T):
+    sim = simulate(graph_path, [agent_type], T)
+    assert sim.env.all_terminated()
+
+
+@pytest.mark.parametrize('T', [0, 0.01])
+def test_rtastar_reuses_kept_tree(T, monkeypatch):
+    graph_path = os.path.join(os.path.dirname(__file__), 'basic.config')
+    kept_tree, kept_trees = RTAStar.kept_tree, []
+
+    def record_kept_tree(self, env):
+        kept_trees.append(kept_tree(self, env))
+        return kept_trees[-1]
+
+    monkeypatch.setattr(RTAStar, 'kept_tree', record_kept_tree)
+    kept = simulate(graph_path, [RTAStar], T).env.agents[0]
+    assert any(tree is not None for tree in kept_trees)
+    if T == 0:  # with T > 0, reusing trees also changes the agent's timing, and so its route
+        monkeypatch.setattr(RTAStar, 'kept_tree', lambda self, env: None)
+        rebuilt = simulate(graph_path, [RTAStar], T).env.agents[0]
+        assert kept.expand_count < rebuilt.expand_count
+
+
+@pytest.mark.parametrize('agent_type', AGENT_TYPES, ids=lambda agent_type: agent_type.__name__)
+@pytest.mark.parametrize('graph_path', CONFIGS, ids=os.path.basename)
+def test_backends_agree(graph_path, agent_type):
+    runs = []
+    for backend in ['dict', 'csr']:
+        Configurator.backend = backend
+        LRTAStar.h_tables.clear()
+        runs.append(run(graph_path, agent_type))
+    assert runs[0] == runs[1]
+
+
+@pytest.mark.parametrize('graph_path', CONFIGS, ids=os.path.basename)
+def test_workers_match_serial_search(graph_path, monkeypatch):
+    serial = run(graph_path, AStar)
+    monkeypatch.setattr(Configurator, 'workers', 2)
+    try:
+        assert run(graph_path, AStar) == serial
+    finally:
+        HeuristicPool.shutdown_all()
+
+
+def first_strategy_cost(graph_path, seed, agent_type, monkeypatch):
+    """:return: the planned cost of the first strategy devised by a single agent"""
+    get_search_tree, trees = agent_type.get_search_tree, []
+
+    def record_search_tree(self, env):
+        trees.append(get_search_tree(self, env))
+        return trees[-1]
+
+    monkeypatch.setattr(agent_type, 'get_search_tree', record_search_tree)
+    run(graph_path, agent_type, seed=seed)
+    monkeypatch.setattr(agent_type, 'get_search_tree', get_search_tree)
+    return trees[0].solution.cost
+
+
+@pytest.mark.parametrize('agent_type, config', [
+    (AStar, {'graph_search': True}),
+    (SMAStar, {'memory_limit': 10 ** 6}),
+    (BeamSearch, {'beam_width': 10 ** 6}),
+], ids=['graph_search', 'SMAStar', 'BeamSearch'])
+@pytest.mark.parametrize('graph_path, seed', SEARCH_GRAPHS, ids=lambda param: os.path.basename(str(param)))
+def test_unbounded_search_matches_astar(graph_path, seed, agent_type, config, monkeypatch):
+    """
+    graph search, and SMA*/beam search with limits they never reach, devise strategies as good as A*'s
+    (equally good strategies may break ties differently, and so score differently)
+    """
+    monkeypatch.setattr(Configurator, 'n_vertices', RANDOM_GRAPH_SIZE)
+    cost = first_strategy_cost(graph_path, seed, AStar, monkeypatch)
+    for name, value in config.items():
+        monkeypatch.setattr(Configurator, name, value)
+    assert first_strategy_cost(graph_path, seed, agent_type, monkeypatch) == cost
@@ -1,9 +1,15 @@
 import os
 import heapq
+import numbers
+from array import array
+from bisect import bisect_left
 import networkx as nx
 import matplotlib.pyplot as plt
 from heapq import _siftdown
+from collections import OrderedDict
 from typing import List, Dict, Tuple
+from utils.profiler import profiled
+from utils.shortest_paths import ShortestPaths
 
 
 class Heap:
@@ -38,10 +44,191 @@ class Heap:
         idx = self.heap.index(item)
         _siftdown(self.heap, 0, idx)
 
+    def __contains__(self, element):
+        return element in self.set
+
     def __str__(self):
         return str([str(e) for e in self.set])
 
 
+class IndexedHeap:
+    """A binary min-heap that keeps track of each element's position in the heap.
+       Membership tests are O(1), decrease_key and remove are O(log n)"""
+    def __init__(self, elements: List=[]):
+        self.heap = list(elements)
+        heapq.heapify(self.heap)
+        self.pos = {element: i for i, element in enumerate(self.heap)}
+
+    def insert(self, element):
+        self.heap.append(element)
+        self.sift_up(len(self.heap) - 1)
+
+    def insert_many(self, elements):
+        for element in elements:
+            self.insert(element)
+
+    def extract_min(self):
+        return self.remove(self.heap[0])
+
+    def remove(self, element):
+        idx = self.pos.pop(element)
+        last = self.heap.pop()
+        if idx < len(self.heap):
+            # fill the hole with the last element, which may have to move in either direction
+            self.heap[idx] = last
+            self.pos[last] = idx
+            self.sift_up(idx)
+            self.sift_down(self.pos[last])
+        return element
+
+    def is_empty(self):
+        return len(self.heap) == 0
+
+    def is_min_heap(self):
+        return all(self.heap[i] >= self.heap[(i - 1) // 2] for i in range(1, len(self.heap)))
+
+    def decrease_key(self, element):
+        """restores the heap property after the key of element was decreased"""
+        self.sift_up(self.pos[element])
+
+    def sift_up(self, idx, start_idx=0):
+        """moves the element at idx up towards start_idx until its parent is not larger"""
+        heap, pos = self.heap, self.pos
+        element = heap[idx]
+        while idx > start_idx:
+            parent_idx = (idx - 1) >> 1
+            parent = heap[parent_idx]
+            if not element < parent:
+                break
+            heap[idx] = parent
+            pos[parent] = idx
+            idx = parent_idx
+        heap[idx] = element
+        pos[element] = idx
+
+    def sift_down(self, idx):
+        """moves the element at idx down to a leaf along the smaller children, then back up to its place.
+           same element order as heapq, so ties are broken exactly as in Heap"""
+        heap, pos = self.heap, self.pos
+        n = len(heap)
+        start_idx = idx
+        element = heap[idx]
+        child_idx = 2 * idx + 1
+        while child_idx < n:
+            if child_idx + 1 < n and not heap[child_idx] < heap[child_idx + 1]:
+                child_idx += 1
+            child = heap[child_idx]
+            heap[idx] = child
+            pos[child] = idx
+            idx = child_idx
+            child_idx = 2 * idx + 1
+        heap[idx] = element
+        pos[element] = idx
+        self.sift_up(idx, start_idx)
+
+    def __contains__(self, element):
+        return element in self.pos
+
+    def __len__(self):
+        return len(self.heap)
+
+    def __iter__(self):
+        return iter(self.heap)
+
+    def __str__(self):
+        return str([str(e) for e in self.heap])
+
+
+class BucketQueue:
+    """
+    A priority queue for small non-negative integer costs: an array of buckets indexed by cost, each holding its
+    elements by depth, deeper first (same order as Plan.__lt__). Equal (cost, depth) elements are extracted last in
+    first out. Insert, remove and membership tests are O(1), extract_min is amortized O(1) while the extracted costs
+    do not decrease (O(depths in the bucket) otherwise).
+    Once an element with a non-integer (or negative) cost is inserted, the queue falls back to an IndexedHeap
+    (ordered by the elements' __lt__, which should agree with key).
+    """
+    def __init__(self, elements: List=[], key=None):
+        """:param key: function of an element, returning its (cost, depth)"""
+        self.key = key or (lambda element: (element.cost, element.depth))
+        # cost -> ({depth: {element: None}}, max-heap of the bucket's depths, depths in the heap) or None
+        self.buckets = []
+        self.min_cost = 0  # all the buckets below it are empty
+        self.pos = {}  # element -> (cost, depth)
+        self.fallback: IndexedHeap = None
+        self.insert_many(elements)
+
+    def insert(self, element):
+        if self.fallback is not None:
+            return self.fallback.insert(element)
+        cost, depth = self.key(element)
+        if not (isinstance(cost, numbers.Integral) or isinstance(cost, float) and cost.is_integer()) or cost < 0:
+            self.fallback = IndexedHeap(list(self.pos) + [element])
+            self.buckets, self.pos = [], {}
+            return
+        cost = int(cost)  # numpy integers as well (see doomed_people)
+        if cost >= len(self.buckets):
+            self.buckets.extend([None] * (cost + 1 - len(self.buckets)))
+        bucket = self.buckets[cost]
+        if bucket is None:
+            bucket = self.buckets[cost] = ({}, [], set())
+        levels, depths, queued = bucket
+        level = levels.get(depth)
+        if level is None:
+            level = levels[depth] = {}
+            if depth not in queued:  # an emptied level may still be in the heap
+                queued.add(depth)
+                heapq.heappush(depths, -depth)
+        level[element] = None
+        self.pos[element] = cost, depth
+        if cost < self.min_cost:
+            self.min_cost = cost
+
+    def insert_many(self, elements):
+        for element in elements:
+            self.insert(element)
+
+    def extract_min(self):
+        if self.fallback is not None:
+            return self.fallback.extract_min()
+        if not self.pos:
+            raise IndexError('extract_min from an empty {}'.format(self.__class__.__name__))
+        while self.buckets[self.min_cost] is None:
+            self.min_cost += 1
+        levels, depths, queued = self.buckets[self.min_cost]
+        while -depths[0] not in levels:
+            queued.remove(-heapq.heappop(depths))  # a level that was emptied
+        return self.remove(next(reversed(levels[-depths[0]])))
+
+    def remove(self, element):
+        if self.fallback is not None:
+            return self.fallback.remove(element)
+        cost, depth = self.pos.pop(element)
+        levels = self.buckets[cost][0]
+        level = levels[depth]
+        del level[element]
+        if not level:
+            del levels[depth]
+            if not levels:
+                self.buckets[cost] = None
+        return element
+
+    def is_empty(self):
+        return len(self) == 0
+
+    def __contains__(self, element):
+        return element in (self.pos if self.fallback is None else self.fallback)
+
+    def __len__(self):
+        return len(self.pos) if self.fallback is None else len(self.fallback)
+
+    def __iter__(self):
+        return iter(self.pos if self.fallback is None else self.fallback)
+
+    def __str__(self):
+        return str([str(e) for e in self])
+
+
 class Stack:
     def __init__(self):
         self.stack = []
@@ -64,12 +251,22 @@ class Queue(Stack):
         self.stack.insert(0, element)
 
 
+def iter_bits(mask: int):
+    """yields the indices of the set bits of mask, in ascending order"""
+    while mask:
+        low_bit = mask & -mask
+        yield low_bit.bit_length() - 1
+        mask ^= low_bit
+
+
 ## GRAPH ##
 class Node:
     """A base Node class for nodes used in the Graph class"""
+    __slots__ = ('label', 'id', 'd', 'prev')
 
     def __init__(self, label):
         self.label = label
+        self.id = None  # index of the node in its graph, assigned by Graph.add_vertex
         # dijkstra algorithm aux variables:
         self.d = 0
         self.prev = None
@@ -97,6 +294,8 @@ class Node:
 
 
 class Edge:
+    __slots__ = ('name', 'v1', 'v2', 'w', 'blocked', 'deadline', 'id')
+
     def __init__(self, v1: Node, v2: Node, w=0, name=''):
         """edge created lexicographically by its vertices names"""
         if v2 < v1:
@@ -107,6 +306,7 @@ class Edge:
         self.w = w
         self.blocked = False
         self.deadline = float('inf')
+        self.id = None  # index of the edge in its graph, assigned by Graph.add_edge
 
     def get(self):
         return self.v1, self.v2, self.w
@@ -126,29 +326,51 @@ class Edge:
 
 class Graph:
     """Graph with blockable edges"""
+    priority_queue = IndexedHeap  # dijkstra's queue type
+    MAX_SHORTEST_PATHS = 256  # number of single-source shortest paths results kept (see shortest_paths)
 
     def __init__(self, V: List[Node]=[], E: List[Edge]=[]):
         self.pos = None  # used to maintain vertices position in visualization
+        self.interactive = True  # display() plots the graph only in interactive mode
         self.n_vertices = 0
-        self.V: Dict[Node, List[Node]] = {}
-        self.Adj: Dict[Tuple[Node, Node], Edge] = {}
+        # integer indexing of vertices and edges: vertex_list[v.id] == v, edge_list[e.id] == e
+        self.vertex_list: List[Node] = []
+        self.blocked_mask = 0  # bitmask of the edges with e.blocked set
+        self.deadline_edges: List[Edge] = []  # edges with a finite deadline
+        self.n_dijkstra_calls = 0  # dijkstra runs: full ones, and the restricted ones repairing cached results
+        self.sp_cache: OrderedDict[Tuple[int, int], ShortestPaths] = OrderedDict()
+        self.sp_cache_hits = self.sp_cache_misses = 0
+        self.n_dijkstra_repairs = 0
+        self.init_storage()
         self.init(V, E)
 
+    def init_storage(self):
+        """initializes the (empty) adjacency and edge storage of the graph backend"""
+        self.V: Dict[Node, Dict[Node, None]] = {}  # neighbours sorted by vertex id, the order of the CSR backend
+        self.Adj: Dict[Tuple[Node, Node], Edge] = {}
+        self.edge_list: List[Edge] = []
+
     def init(self, V: List[Node], E: List[Edge]):
         """initialize graph with list of nodes and a list of edges"""
         for v in V: self.add_vertex(v)
         for e in E: self.add_edge(e)
 
+    def has_vertex(self, v):
+        return v in self.V
+
     def add_vertex(self, v):
-        if v in self.V:
+        if self.has_vertex(v):
             raise Exception("{} already exists in V".format(v))
-        self.V[v] = set([])
+        self.V[v] = {}
+        v.id = len(self.vertex_list)
+        self.vertex_list.append(v)
         self.n_vertices += 1
+        self.structure_changed()
 
     def remove_vertex(self, v):
-        if v not in self.V:
+        if not self.has_vertex(v):
             raise Exception("{} not in V".format(v))
-        for u in self.V[v]:
+        for u in list(self.V[v]):
             self.remove_edge(v, u)
         self.n_vertices -= 1
 
@@ -156,7 +378,7 @@ class Graph:
         return self.Adj.get((v1, v2))
 
     def edge_exists_check(self, v1, v2, expected: bool):
-        if (v1 not in self.V) or (v2 not in self.V):
+        if not self.has_vertex(v1) or not self.has_vertex(v2):
             raise Exception("{} or {} are not in V".format(v1, v2))
         edge_exists = self.get_edge(v1, v2)
         if edge_exists and not expected:
@@ -168,29 +390,90 @@ class Graph:
         v1 = e.v1
         v2 = e.v2
         self.edge_exists_check(v1, v2, expected=False)
-        self.V[v1].add(v2)
-        self.V[v2].add(v1)
+        self.add_neighbour(v1, v2)
+        self.add_neighbour(v2, v1)
         self.Adj[v1, v2] = e
         self.Adj[v2, v1] = e
+        e.id = len(self.edge_list)
+        self.edge_list.append(e)
+        self.track_edge_state(e)
+        self.structure_changed()
+
+    def add_neighbour(self, u, v):
+        """adds v to the neighbours of u, keeping them sorted by vertex id (so both backends expand alike)"""
+        neighbours = self.V[u]
+        last = next(reversed(neighbours), None)
+        neighbours[v] = None
+        if last is not None and last.id > v.id:
+            self.V[u] = dict(sorted(neighbours.items(), key=lambda item: item[0].id))
+
+    def track_edge_state(self, e: Edge):
+        """registers the blocked flag and deadline of a newly added edge"""
+        if e.blocked:
+            self.blocked_mask |= 1 << e.id
+        if e.deadline < float('inf'):
+            self.deadline_edges.append(e)
 
     def remove_edge(self, v1, v2):
         self.edge_exists_check(v1, v2, expected=True)
-        self.V[v1].remove(v2)
-        self.V[v2].remove(v1)
+        eid = self.get_edge(v1, v2).id
+        self.edge_list[eid] = None  # keep the ids of the remaining edges intact
+        self.blocked_mask &= ~(1 << eid)
+        del self.V[v1][v2]
+        del self.V[v2][v1]
         del self.Adj[v1, v2]
         del self.Adj[v2, v1]
+        self.structure_changed()
+
+    def structure_changed(self):
+        """called when vertices or edges are added or removed, drops the cached shortest paths"""
+        self.sp_cache.clear()
 
     def block_edge(self, v1, v2, block_time):
         self.edge_exists_check(v1, v2, expected=True)
         e = self.get_edge(v1, v2)
-        e.blocked = True
+        self.set_blocked(e, True)
+        if e.deadline == float('inf'):
+            self.deadline_edges.append(e)
         e.deadline = block_time
 
-    def is_blocked(self, u, v):
-        return self.get_edge(u, v).blocked
+    def set_blocked(self, e: Edge, blocked: bool):
+        e.blocked = blocked
+        if blocked:
+            self.blocked_mask |= 1 << e.id
+        else:
+            self.blocked_mask &= ~(1 << e.id)
 
-    def neighbours(self, u):
-        return [v for v in self.V[u] if not self.is_blocked(u, v)]
+    def set_blocked_mask(self, mask: int):
+        """blocks exactly the edges in mask, updating only the edges whose blocked flag changes"""
+        for e in self.edges_of(self.blocked_mask ^ mask):
+            self.set_blocked(e, not e.blocked)
+
+    def blocked_key(self, time=None):
+        """returns a bitmask of the currently blocked edges (by edge id)"""
+        return self.blocked_mask
+
+    def vertices_of(self, mask: int):
+        """returns the vertices whose ids are set in mask"""
+        return [self.vertex_list[i] for i in iter_bits(mask)]
+
+    def edges_of(self, mask: int):
+        """returns the edges whose ids are set in mask"""
+        return [self.edge_list[i] for i in iter_bits(mask)]
+
+    def edge_blocked(self, e: Edge, time=None):
+        """:param time: the time the edge is entered at, for graphs whose edges expire (see SmartGraph)"""
+        return e.blocked
+
+    def is_blocked(self, u, v, time=None):
+        return self.edge_blocked(self.get_edge(u, v), time)
+
+    def neighbours(self, u, time=None):
+        return [v for v in self.V[u] if not self.is_blocked(u, v, time)]
+
+    def weighted_neighbours(self, u, time=None):
+        """returns (v, w(u,v)) pairs for all neighbours v of u that are not blocked when leaving u at the given time"""
+        return [(v, self.Adj[u, v].w) for v in self.neighbours(u, time)]
 
     def get_vertices(self):
         return self.V.keys()
@@ -199,13 +482,13 @@ class Graph:
         return self.Adj.values()
 
     def display(self, graph_id=0, output_path='.', save_img=False):
-        # if not Configurator.interactive:
-        #     return
+        if not self.interactive:
+            return
         filename = '{0}/graph_{1}.png'.format(output_path, graph_id)
         V = self.get_vertices()
         G = nx.Graph()
         G.add_nodes_from(V)
-        G.add_weighted_edges_from([e.get() for e in self.Adj.values() if not e.blocked])
+        G.add_weighted_edges_from([e.get() for e in self.get_edges() if not e.blocked])
         edge_labels = nx.get_edge_attributes(G, 'weight')
         node_labels = {v: v.describe() for v in G.nodes()}
         if G.number_of_nodes() == 0:
@@ -249,6 +532,7 @@ class Graph:
         for v in self.get_vertices():
             print(v.label + ': ' + '->'.join([v.label for v in self.get_shortest_path(src, v)]))
 
+    @profiled('dijkstra')
     def dijkstra(self, s, debug=False):
         """
         :param s: source vertex
@@ -256,21 +540,323 @@ class Graph:
                  v.d = dist from source
                  v.prev = previous node in shortest path to source
         """
+        self.n_dijkstra_calls += 1
         inf = float('inf')
         V = self.get_vertices()
         for v in V:
             v.d = inf
             v.prev = None
         s.d = 0
-        Q = Heap(list(V))
+        Q = self.priority_queue(list(V))
         while not Q.is_empty():
             u = Q.extract_min()
             if debug: self.display(str(Q) + '; u = ' + u.label)
-            for v in self.neighbours(u):
-                if v in Q.set:
+            for v, w in self.weighted_neighbours(u):
+                if v in Q:
                     if debug: self.display(str(Q) + '; u = ' + u.label + ', v = ' + v.label)
-                    val = u.d + self.Adj[u, v].w  # w(u,v)
+                    val = u.d + w  # w(u,v)
                     if val < v.d:
                         v.d = val
                         v.prev = u
                         Q.decrease_key(v)
+
+    def shortest_paths(self, s, time=None) -> ShortestPaths:
+        """
+        returns the shortest paths from s in the graph's current blocking state.
+        results are immutable, and kept in an LRU cache by (source, blocked edges)
+        :param time: the time edges are checked at (see edge_blocked)
+        """
+        key = s.id, self.blocked_key(time=time)
+        result = self.sp_cache.get(key)
+        if result is not None:
+            self.sp_cache_hits += 1
+            self.sp_cache.move_to_end(key)
+            return result
+        self.sp_cache_misses += 1
+        # edges are only ever added to the blocked ones while a simulation runs: a cached result of the same source
+        # computed with fewer blocked edges is repaired instead of recomputing all the distances
+        base = min((r for (i, blocked), r in self.sp_cache.items() if i == s.id and blocked & ~key[1] == 0),
+                   key=lambda r: bin(key[1] & ~r.blocked_key).count('1'), default=None)
+        result = self.single_source_dijkstra(s, time) if base is None else self.repair_shortest_paths(base, time)
+        self.sp_cache[key] = result
+        if len(self.sp_cache) > self.MAX_SHORTEST_PATHS:
+            self.sp_cache.popitem(last=False)
+        return result
+
+    @profiled('dijkstra')
+    def single_source_dijkstra(self, s, time=None) -> ShortestPaths:
+        """computes the shortest paths from s, without writing to the vertices (see shortest_paths)"""
+        self.n_dijkstra_calls += 1
+        V = self.vertex_list
+        dist = [float('inf')] * len(V)
+        prev = [-1] * len(V)
+        dist[s.id] = 0
+        Q = [(0, s.id)]  # lazy deletion: outdated entries are skipped when popped
+        while Q:
+            d, i = heapq.heappop(Q)
+            if d > dist[i]:
+                continue
+            for v, w in self.weighted_neighbours(V[i], time):
+                val = d + w
+                if val < dist[v.id]:
+                    dist[v.id] = val
+                    prev[v.id] = i
+                    heapq.heappush(Q, (val, v.id))
+        return ShortestPaths.create(s.id, self.blocked_key(time=time), dist, prev)
+
+    @profiled('dijkstra_repair')
+    def repair_shortest_paths(self, base: ShortestPaths, time=None) -> ShortestPaths:
+        """
+        derives the shortest paths of the current blocking state from base, computed when a subset of the currently
+        blocked edges was blocked. Only the vertices below a newly blocked edge in base's shortest path tree are
+        invalidated: each is seeded with its best valid neighbour, and a dijkstra restricted to them settles the rest.
+        """
+        self.n_dijkstra_repairs += 1
+        key = self.blocked_key(time=time)
+        dist, prev = base.dist.tolist(), base.prev.tolist()
+        stack = []
+        for e in self.edges_of(key & ~base.blocked_key):
+            u, v = e.v1.id, e.v2.id
+            if prev[v] == u:
+                stack.append(v)
+            elif prev[u] == v:
+                stack.append(u)
+        if not stack:
+            return ShortestPaths(base.source, key, base.dist, base.prev)  # the tree is intact, share its arrays
+        self.n_dijkstra_calls += 1
+        children = [[] for _ in prev]
+        for i, p in enumerate(prev):
+            if p >= 0:
+                children[p].append(i)
+        invalid = set()
+        while stack:
+            i = stack.pop()
+            invalid.add(i)
+            stack.extend(children[i])
+        V = self.vertex_list
+        for i in invalid:
+            dist[i], prev[i] = float('inf'), -1
+        Q = []
+        for i in invalid:
+            for v, w in self.weighted_neighbours(V[i], time):
+                if v.id not in invalid and dist[v.id] + w < dist[i]:
+                    dist[i], prev[i] = dist[v.id] + w, v.id
+            if prev[i] >= 0:
+                Q.append((dist[i], i))
+        heapq.heapify(Q)
+        while Q:
+            d, i = heapq.heappop(Q)
+            if d > dist[i]:
+                continue
+            for v, w in self.weighted_neighbours(V[i], time):
+                val = d + w
+                if v.id in invalid and val < dist[v.id]:
+                    dist[v.id] = val
+                    prev[v.id] = i
+                    heapq.heappush(Q, (val, v.id))
+        return ShortestPaths.create(base.source, key, dist, prev)
+
+
+class CSREdge(Edge):
+    """A view of an edge in a CSRGraph. Its attributes are read from (and written to) the graph's edge arrays"""
+    __slots__ = ('G',)
+
+    def __init__(self, G, eid):
+        self.G = G
+        self.id = eid
+
+    @property
+    def v1(self):
+        return self.G.vertex_list[self.G.edge_v1[self.id]]
+
+    @property
+    def v2(self):
+        return self.G.vertex_list[self.G.edge_v2[self.id]]
+
+    @property
+    def w(self):
+        return self.G.weights[self.id]
+
+    @property
+    def name(self):
+        return self.G.edge_names[self.id]
+
+    @property
+    def blocked(self):
+        return bool(self.G.blocked[self.id])
+
+    @blocked.setter
+    def blocked(self, value):
+        self.G.blocked[self.id] = bool(value)
+
+    @property
+    def deadline(self):
+        return self.G.deadlines[self.id]
+
+    @deadline.setter
+    def deadline(self, value):
+        self.G.deadlines[self.id] = value
+
+
+class CSREdgeList:
+    """Read only sequence of CSREdge views over all edge ids of a CSRGraph (None for removed edges)"""
+    def __init__(self, G):
+        self.G = G
+
+    def __len__(self):
+        return len(self.G.weights)
+
+    def __getitem__(self, eid):
+        return None if self.G.removed[eid] else CSREdge(self.G, eid)
+
+    def __iter__(self):
+        return (self[eid] for eid in range(len(self)))
+
+
+class CSRGraph(Graph):
+    """
+    Graph backend with integer vertex ids and edges stored in compressed sparse row (CSR) arrays:
+    the neighbours of vertex i are targets[offsets[i]:offsets[i+1]] (sorted), through the edges with ids
+    edge_ids[offsets[i]:offsets[i+1]]. Edge endpoints, weights, blocked flags and deadlines are arrays indexed
+    by edge id. Edge objects are only created as views (CSREdge) when requested.
+    """
+
+    def init_storage(self):
+        self.edge_list = CSREdgeList(self)
+        # edge arrays, indexed by edge id
+        self.edge_v1 = array('l')
+        self.edge_v2 = array('l')
+        self.weights = array('d')
+        self.deadlines = array('d')
+        self.blocked = bytearray()
+        self.removed = bytearray()
+        self.edge_names: List[str] = []
+        # CSR adjacency, built lazily after edges are added or removed
+        self.offsets = self.targets = self.edge_ids = None
+
+    def build(self):
+        """builds the CSR adjacency arrays from the edge arrays"""
+        rows = [[] for _ in self.vertex_list]
+        for eid in range(len(self.weights)):
+            if not self.removed[eid]:
+                u, v = self.edge_v1[eid], self.edge_v2[eid]
+                rows[u].append((v, eid))
+                rows[v].append((u, eid))
+        self.offsets, self.targets, self.edge_ids = array('l', [0]), array('l'), array('l')
+        for u, row in enumerate(rows):
+            row.sort()
+            for (v1, eid1), (v2, eid2) in zip(row, row[1:]):
+                if v1 == v2:
+                    raise Exception("({},{}) already exists in E".format(self.vertex_list[u], self.vertex_list[v1]))
+            self.targets.extend(v for v, eid in row)
+            self.edge_ids.extend(eid for v, eid in row)
+            self.offsets.append(len(self.targets))
+
+    def row(self, u):
+        """returns the CSR index range of u's neighbours"""
+        if self.offsets is None:
+            self.build()
+        return self.offsets[u.id], self.offsets[u.id + 1]
+
+    def has_vertex(self, v):
+        return v.id is not None and v.id < len(self.vertex_list) and self.vertex_list[v.id] is v
+
+    def add_vertex(self, v):
+        if self.has_vertex(v):
+            raise Exception("{} already exists in V".format(v))
+        v.id = len(self.vertex_list)
+        self.vertex_list.append(v)
+        self.n_vertices += 1
+        self.offsets = None
+        self.structure_changed()
+
+    def remove_vertex(self, v):
+        raise Exception("Error: {} does not support removing vertices".format(self.__class__.__name__))
+
+    def get_edge_id(self, v1, v2):
+        start, end = self.row(v1)
+        i = bisect_left(self.targets, v2.id, start, end)
+        if i < end and self.targets[i] == v2.id:
+            return self.edge_ids[i]
+        return None
+
+    def get_edge(self, v1, v2):
+        eid = self.get_edge_id(v1, v2)
+        return None if eid is None else CSREdge(self, eid)
+
+    def add_edge(self, e: Edge):
+        if self.offsets is not None:
+            self.edge_exists_check(e.v1, e.v2, expected=False)
+        elif not self.has_vertex(e.v1) or not self.has_vertex(e.v2):
+            raise Exception("{} or {} are not in V".format(e.v1, e.v2))
+        # while the adjacency is not built, duplicate edges are detected when it is built
+        e.id = len(self.weights)
+        self.edge_v1.append(e.v1.id)
+        self.edge_v2.append(e.v2.id)
+        self.weights.append(e.w)
+        self.deadlines.append(e.deadline)
+        self.blocked.append(e.blocked)
+        self.removed.append(False)
+        self.edge_names.append(e.name)
+        self.offsets = None
+        self.track_edge_state(CSREdge(self, e.id))
+        self.structure_changed()
+
+    def remove_edge(self, v1, v2):
+        self.edge_exists_check(v1, v2, expected=True)
+        eid = self.get_edge_id(v1, v2)
+        self.removed[eid] = True
+        self.blocked_mask &= ~(1 << eid)
+        self.offsets = None
+        self.structure_changed()
+
+    def edge_id_blocked(self, eid, time=None):
+        return self.blocked[eid]
+
+    def is_blocked(self, u, v, time=None):
+        return self.edge_id_blocked(self.get_edge_id(u, v), time)
+
+    def neighbours(self, u, time=None):
+        start, end = self.row(u)
+        V, targets, edge_ids = self.vertex_list, self.targets, self.edge_ids
+        return [V[targets[i]] for i in range(start, end) if not self.edge_id_blocked(edge_ids[i], time)]
+
+    def weighted_neighbours(self, u, time=None):
+        start, end = self.row(u)
+        V, targets, edge_ids, weights = self.vertex_list, self.targets, self.edge_ids, self.weights
+        return [(V[targets[i]], weights[edge_ids[i]]) for i in range(start, end)
+                if not self.edge_id_blocked(edge_ids[i], time)]
+
+    def get_vertices(self):
+        return self.vertex_list
+
+    def get_edges(self):
+        return [e for e in self.edge_list if e is not None]
+
+    @profiled('dijkstra')
+    def dijkstra(self, s, debug=False):
+        """
+        :param s: source vertex
+        :return: after calling this method, foreach v in V:
+                 v.d = dist from source
+                 v.prev = previous node in shortest path to source
+        """
+        self.n_dijkstra_calls += 1
+        inf = float('inf')
+        V = self.vertex_list
+        dist = [inf] * len(V)
+        prev = [None] * len(V)
+        dist[s.id] = 0
+        Q = [(0, s.id)]  # lazy deletion: outdated entries are skipped when popped
+        while Q:
+            d, i = heapq.heappop(Q)
+            if d > dist[i]:
+                continue
+            for v, w in self.weighted_neighbours(V[i]):
+                val = d + w
+                if val < dist[v.id]:
+                    dist[v.id] = val
+                    prev[v.id] = V[i]
+                    heapq.heappush(Q, (val, v.id))
+        for v in V:
+            v.d, v.prev = dist[v.id], prev[v.id]
@@ -0,0 +1,81 @@
+import json
+import atexit
+from enum import IntEnum
+
+
+class LogLevel(IntEnum):
+    DEBUG   = 10
+    INFO    = 20
+    WARNING = 30
+    SILENT  = 100
+
+
+class TraceSink:
+    """Buffered JSONL writer for structured trace events"""
+    def __init__(self, path, buffer_size=1000):
+        self.path = path
+        self.buffer_size = buffer_size
+        self.buffer = []
+        open(self.path, 'w').close()
+
+    def emit(self, event, fields):
+        fields['event'] = event
+        self.buffer.append(fields)
+        if len(self.buffer) >= self.buffer_size:
+            self.flush()
+
+    def flush(self):
+        if not self.buffer:
+            return
+        with open(self.path, 'a') as f:
+            f.writelines(json.dumps(fields, default=str) + '\n' for fields in self.buffer)
+        self.buffer = []
+
+
+class Logger:
+    """static logger class. Messages are formatted only if their level is enabled"""
+    level = LogLevel.DEBUG
+    trace_sink: TraceSink = None
+
+    @staticmethod
+    def configure(level=LogLevel.DEBUG, trace_path=None):
+        """:param trace_path: path of a JSONL file to write trace events to (no tracing if None)"""
+        Logger.level = level
+        if Logger.trace_sink is not None:
+            Logger.trace_sink.flush()
+        Logger.trace_sink = TraceSink(trace_path) if trace_path else None
+        if Logger.trace_sink is not None:
+            atexit.register(Logger.trace_sink.flush)
+
+    @staticmethod
+    def enabled(level):
+        return level >= Logger.level
+
+    @staticmethod
+    def log(level, msg, *args, **kwargs):
+        """
+        prints msg if level is enabled.
+        :param msg: a format string for args/kwargs, or a callable that is called with args/kwargs and
+                    returns the message. Either way, the message is only built if it is printed.
+        """
+        if level < Logger.level:
+            return
+        if callable(msg):
+            msg = msg(*args, **kwargs)
+        elif args or kwargs:
+            msg = msg.format(*args, **kwargs)
+        print(msg)
+
+
+def debug(msg, *args, **kwargs):
+    Logger.log(LogLevel.DEBUG, msg, *args, **kwargs)
+
+
+def info(msg, *args, **kwargs):
+    Logger.log(LogLevel.INFO, msg, *args, **kwargs)
+
+
+def trace(event, **fields):
+    """writes a structured event to the trace sink, if tracing is enabled"""
+    if Logger.trace_sink is not None:
+        Logger.trace_sink.emit(event, fields)
@@ -0,0 +1,102 @@
+import json
+import atexit
+from time import perf_counter
+from functools import wraps
+
+
+class PhaseStats:
+    """call count, cumulative and max time (in seconds) of a profiled phase"""
+    def __init__(self):
+        self.count = 0
+        self.total_time = 0.0
+        self.max_time = 0.0
+
+    def record(self, elapsed):
+        self.count += 1
+        self.total_time += elapsed
+        if elapsed > self.max_time:
+            self.max_time = elapsed
+
+    def to_dict(self):
+        return dict(count=self.count, total_time=self.total_time, max_time=self.max_time)
+
+
+class Profiler:
+    """
+    static profiler class. Methods decorated with @profiled(phase) are timed only while the profiler is enabled:
+    enabling it replaces them with timing wrappers, and disabling it restores the original functions,
+    so a disabled profiler adds no overhead at all.
+    """
+    enabled = False
+    path: str = None
+    phases = {}   # phase name -> PhaseStats
+    reports = []  # collected reports, written to path at exit
+    targets = []  # (owner class, attribute name, original function, phase name) of every profiled method
+
+    @staticmethod
+    def configure(path=None):
+        """:param path: path of a JSON file to write the collected reports to (profiling is disabled if None)"""
+        Profiler.path = path
+        Profiler.set_enabled(path is not None)
+        if path is not None:
+            atexit.register(Profiler.dump)
+
+    @staticmethod
+    def set_enabled(enabled):
+        Profiler.enabled = enabled
+        for owner, name, func, phase in Profiler.targets:
+            setattr(owner, name, Profiler.timed(func, phase) if enabled else func)
+
+    @staticmethod
+    def timed(func, phase):
+        stats = Profiler.phases.setdefault(phase, PhaseStats())
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            start = perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                stats.record(perf_counter() - start)
+        return wrapper
+
+    @staticmethod
+    def reset():
+        for stats in Profiler.phases.values():
+            stats.__init__()
+
+    @staticmethod
+    def report():
+        """:return: {phase: {count, total_time, max_time}} of the phases that were called since the last reset"""
+        return {phase: stats.to_dict() for phase, stats in Profiler.phases.items() if stats.count}
+
+    @staticmethod
+    def collect(**labels):
+        """returns the current report, keeps it (with the given labels) for the JSON dump and resets the counters"""
+        report = Profiler.report()
+        Profiler.reports.append(dict(labels, phases=report))
+        Profiler.reset()
+        return report
+
+    @staticmethod
+    def dump(path=None):
+        path = path or Profiler.path
+        if path is None:
+            return
+        with open(path, 'w') as f:
+            json.dump(Profiler.reports, f, indent=2)
+
+
+class profiled:
+    """method decorator: registers the method as a profiled phase (see Profiler)"""
+    def __init__(self, phase):
+        self.phase = phase
+        self.func = None
+
+    def __call__(self, func):
+        self.func = func
+        return self
+
+    def __set_name__(self, owner, name):
+        Profiler.targets.append((owner, name, self.func, self.phase))
+        setattr(owner, name, Profiler.timed(self.func, self.phase) if Profiler.enabled else self.func)
@@ -0,0 +1,41 @@
+import numpy as np
+from typing import NamedTuple
+
+
+class ShortestPaths(NamedTuple):
+    """
+    Immutable single-source shortest paths of a graph for a fixed set of blocked edges (see Graph.shortest_paths).
+    dist[i] - distance from the source to the vertex with id i (inf if unreachable)
+    prev[i] - id of the vertex preceding i in the shortest path from the source (-1 for the source and if unreachable)
+    """
+    source: int
+    blocked_key: int
+    dist: np.ndarray
+    prev: np.ndarray
+
+    @staticmethod
+    def create(source, blocked_key, dist, prev):
+        dist, prev = np.array(dist, dtype=float), np.array(prev, dtype=np.int32)
+        dist.flags.writeable = prev.flags.writeable = False
+        return ShortestPaths(source, blocked_key, dist, prev)
+
+    def distance(self, v):
+        return self.dist[v.id]
+
+    def first_hop(self, v):
+        """returns the id of the vertex following the source in the shortest path to v"""
+        if self.dist[v.id] == np.inf:
+            raise Exception('path does not exist: {} -> {}'.format(self.source, v))
+        i = v.id
+        while i != self.source and self.prev[i] != self.source:
+            i = int(self.prev[i])
+        return i
+
+    def path_ids(self, v):
+        """returns the ids of the vertices in the shortest path from the source to v (empty if unreachable)"""
+        if self.dist[v.id] == np.inf:
+            return []
+        path = [v.id]
+        while path[-1] != self.source:
+            path.append(int(self.prev[path[-1]]))
+        return path[::-1]